@@ -0,0 +1,311 @@
+"""
+Motor de alertas avaliado uma vez por snapshot.
+
+As regras são lidas de um arquivo TOML (ALERTAS_CONFIG, padrão alertas.toml;
+veja alertas.example.toml) e avaliadas em uma thread própria sempre que a
+camada de dados publica um snapshot novo. O custo independe do número de
+sessões abertas: os agregados por unidade já vêm prontos no snapshot e o
+trabalho por linha (transições de registro) é feito uma vez por snapshot.
+
+Tipos de regra:
+    taxa_minima    taxa de registro da unidade abaixo de `limite` (%)
+    desregistros   mais de `quantidade` ramais deixaram de registrar em
+                   `janela_minutos`
+    ramal_critico  algum ramal de `ramais` não está registrado
+
+Sem sessões abertas ninguém pede dados ao motor; por isso a própria thread
+dos alertas pede um snapshot (snapshot.STORE.obter) a cada DADOS_TTL
+segundos sem publicação, e as regras continuam sendo avaliadas.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import tomllib
+import urllib.request
+from collections import Counter, deque
+from datetime import datetime
+
+import metricas
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+COOLDOWN_PADRAO_MINUTOS = 30
+INTERVALO_RECARGA_PADRAO = 300
+TODAS = '*'
+
+# ============================================================================
+# DESTINOS (WEBHOOK / ARQUIVO)
+# ============================================================================
+
+def _enviar_webhook(url, evento, timeout=5):
+    requisicao = urllib.request.Request(
+        url,
+        data=json.dumps(evento, ensure_ascii=False).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(requisicao, timeout=timeout):
+        pass
+
+
+def _gravar_arquivo(caminho, evento):
+    with open(caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+
+def _criar_destino(config):
+    tipo = config.get('tipo')
+    obrigatoria = {'webhook': 'url', 'arquivo': 'caminho'}.get(tipo)
+    if obrigatoria and obrigatoria not in config:
+        raise ValueError(f"Destino {tipo} sem '{obrigatoria}'")
+    if tipo == 'webhook':
+        return lambda evento: _enviar_webhook(config['url'], evento, config.get('timeout', 5))
+    if tipo == 'arquivo':
+        return lambda evento: _gravar_arquivo(config['caminho'], evento)
+    raise ValueError(f"Destino de alerta desconhecido: {tipo}")
+
+# ============================================================================
+# REGRAS
+# ============================================================================
+
+def _avaliar_taxa_minima(regra, contexto):
+    unidades = contexto.unidades
+    unidade = regra.get('unidade', TODAS)
+    if unidade != TODAS:
+        unidades = unidades[unidades['boname'] == unidade]
+
+    abaixo = unidades[unidades['taxa'] < regra['limite']]
+    return {
+        linha.boname: f"Taxa de registro de {linha.boname} em {linha.taxa}% "
+                      f"(limite {regra['limite']}%)"
+        for linha in abaixo.itertuples()
+    }
+
+
+def _avaliar_desregistros(regra, contexto):
+    unidade = regra.get('unidade', TODAS)
+    total = contexto.desregistros_na_janela(regra['janela_minutos'], unidade)
+    if total <= regra['quantidade']:
+        return {}
+
+    return {
+        unidade: f"{total} ramais deixaram de registrar em {regra['janela_minutos']} min"
+                 + ("" if unidade == TODAS else f" em {unidade}")
+    }
+
+
+def _avaliar_ramal_critico(regra, contexto):
+    return {
+        str(ramal): f"Ramal crítico {ramal} não registrado"
+        for ramal in regra['ramais']
+        if str(ramal) not in contexto.registrados
+    }
+
+
+AVALIADORES = {
+    'taxa_minima': _avaliar_taxa_minima,
+    'desregistros': _avaliar_desregistros,
+    'ramal_critico': _avaliar_ramal_critico,
+}
+
+CHAVES_OBRIGATORIAS = {
+    'taxa_minima': ('limite',),
+    'desregistros': ('quantidade', 'janela_minutos'),
+    'ramal_critico': ('ramais',),
+}
+
+
+def validar_regra(regra):
+    """Falha no carregamento, e não a cada snapshot, se a regra estiver incompleta."""
+    tipo = regra.get('tipo')
+    if tipo not in AVALIADORES:
+        raise ValueError(f"Tipo de regra desconhecido: {tipo}")
+    faltando = [chave for chave in CHAVES_OBRIGATORIAS[tipo] if chave not in regra]
+    if faltando:
+        raise ValueError(
+            f"Regra {regra.get('nome', tipo)} ({tipo}) sem: {', '.join(faltando)}"
+        )
+
+
+class _Contexto:
+    """Dados pré-calculados uma única vez por snapshot e compartilhados pelas regras."""
+
+    def __init__(self, snap, registrados, eventos):
+        self.unidades = snap.unidades
+        self.registrados = registrados
+        self._eventos = eventos
+
+    def desregistros_na_janela(self, janela_minutos, unidade):
+        limite = time.time() - janela_minutos * 60
+        return sum(
+            contagem[unidade]
+            for momento, contagem in self._eventos
+            if momento >= limite
+        )
+
+# ============================================================================
+# MOTOR
+# ============================================================================
+
+class MotorAlertas:
+    def __init__(self, regras, destinos, cooldown_minutos=COOLDOWN_PADRAO_MINUTOS):
+        for regra in regras:
+            validar_regra(regra)
+            regra.setdefault('nome', regra['tipo'])
+
+        self.regras = regras
+        self.destinos = destinos
+        self.cooldown = cooldown_minutos * 60
+
+        self._fila = queue.Queue(maxsize=1)
+        self._registrados_anterior = None
+        self._janela_max = max(
+            (r['janela_minutos'] for r in regras if r['tipo'] == 'desregistros'),
+            default=0
+        ) * 60
+        self._eventos = deque()
+        self._ativos = {}
+
+    def receber(self, snap):
+        """Assinante do SnapshotStore: só enfileira, quem avalia é a thread do motor."""
+        try:
+            self._fila.put_nowait(snap)
+        except queue.Full:
+            try:
+                self._fila.get_nowait()
+            except queue.Empty:
+                pass
+            self._fila.put_nowait(snap)
+
+    def executar(self):
+        while True:
+            intervalo = snapshot.STORE.ttl or INTERVALO_RECARGA_PADRAO
+            try:
+                snap = self._fila.get(timeout=intervalo)
+            except queue.Empty:
+                # Nenhum snapshot no intervalo: pede um ao motor de dados (a
+                # publicação volta por receber() e é avaliada na próxima volta)
+                snapshot.STORE.obter()
+                continue
+            try:
+                self.avaliar(snap)
+            except Exception:
+                logger.exception("Falha ao avaliar alertas do snapshot %s", snap.versao)
+
+    def avaliar(self, snap):
+        df = snap.df
+        if df.empty:
+            registrados = frozenset()
+        else:
+            registrados = frozenset(
+                df.loc[df['status'] == snapshot.STATUS_REGISTRADO, 'serviceid'].astype(str)
+            )
+
+        self._registrar_transicoes(df, registrados)
+        contexto = _Contexto(snap, registrados, self._eventos)
+
+        disparados = {}
+        for regra in self.regras:
+            for alvo, mensagem in AVALIADORES[regra['tipo']](regra, contexto).items():
+                disparados[(regra['nome'], alvo)] = mensagem
+
+        self._notificar(disparados, snap)
+
+    def _registrar_transicoes(self, df, registrados):
+        agora = time.time()
+        anterior = self._registrados_anterior
+        self._registrados_anterior = registrados
+
+        if self._janela_max and anterior is not None and not df.empty:
+            nao_registrados = df['status'] != snapshot.STATUS_REGISTRADO
+            caiu = df['serviceid'].astype(str).isin(anterior) & nao_registrados
+            contagem = Counter(df.loc[caiu, 'boname'].value_counts().to_dict())
+            contagem[TODAS] = int(caiu.sum())
+            if contagem[TODAS]:
+                self._eventos.append((agora, contagem))
+
+        while self._eventos and self._eventos[0][0] < agora - self._janela_max:
+            self._eventos.popleft()
+
+    def _notificar(self, disparados, snap):
+        agora = time.time()
+
+        for chave, mensagem in disparados.items():
+            ultimo = self._ativos.get(chave)
+            if ultimo is not None and agora - ultimo < self.cooldown:
+                continue
+            self._ativos[chave] = agora
+            self._emitir('disparado', chave, mensagem, snap)
+
+        for chave in [c for c in self._ativos if c not in disparados]:
+            del self._ativos[chave]
+            self._emitir('resolvido', chave, "Condição normalizada", snap)
+
+    def _emitir(self, estado, chave, mensagem, snap):
+        regra, alvo = chave
+        evento = {
+            'estado': estado,
+            'regra': regra,
+            'alvo': alvo,
+            'mensagem': mensagem,
+            'versao_snapshot': snap.versao,
+            'momento': datetime.now().isoformat(timespec='seconds'),
+        }
+        metricas.REGISTRO.inc('ramais_alertas_total', regra=regra, estado=estado)
+
+        for destino in self.destinos:
+            try:
+                destino(evento)
+            except Exception as e:
+                logger.warning("Falha ao enviar alerta %s/%s: %s", regra, alvo, e)
+
+
+def carregar_config(caminho):
+    with open(caminho, 'rb') as arquivo:
+        config = tomllib.load(arquivo)
+
+    return MotorAlertas(
+        regras=config.get('regras', []),
+        destinos=[_criar_destino(d) for d in config.get('destinos', [])],
+        cooldown_minutos=config.get('cooldown_minutos', COOLDOWN_PADRAO_MINUTOS)
+    )
+
+
+MOTOR = None
+_lock_inicio = threading.Lock()
+
+
+def iniciar(caminho=None):
+    """
+    Carrega as regras e passa a avaliar cada snapshot publicado.
+
+    Idempotente no processo. Sem arquivo de configuração, ou com arquivo
+    inválido (erro registrado em log), o motor fica desligado e retorna None:
+    um alertas.toml com erro não derruba o painel.
+    """
+    global MOTOR
+    with _lock_inicio:
+        if MOTOR is not None:
+            return MOTOR
+
+        caminho = caminho or os.getenv('ALERTAS_CONFIG', 'alertas.toml')
+        if not os.path.exists(caminho):
+            return None
+
+        try:
+            motor = carregar_config(caminho)
+        except (OSError, tomllib.TOMLDecodeError, ValueError, TypeError) as e:
+            logger.error("Alertas desligados: %s inválido: %s", caminho, e)
+            return None
+        if not motor.regras:
+            return None
+
+        threading.Thread(target=motor.executar, name="motor-alertas", daemon=True).start()
+        snapshot.STORE.assinar(motor.receber)
+        MOTOR = motor
+        return motor
@@ -0,0 +1,174 @@
+"""
+API HTTP de leitura (JSON/CSV) servida a partir do snapshot compartilhado.
+
+Ferramentas do NOC consultam estes endpoints em vez de abrir sessões
+Streamlit. Cada resposta leva um ETag derivado da versão do snapshot, então
+quem repete a consulta com If-None-Match recebe 304 enquanto nada mudar.
+
+    GET /api/ramais?unidade=...&status=...&busca=...&formato=json|csv
+    GET /api/unidades?formato=json|csv
+    GET /api/resumo
+"""
+
+import hmac
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import servidor
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+# Só a própria máquina por padrão: a API entrega nome de usuário (LGPD)
+HOST_PADRAO = '127.0.0.1'
+HOSTS_LOCAIS = ('127.0.0.1', 'localhost', '::1')
+
+# A versão do snapshot recomeça em 1 a cada processo; o ETag leva também
+# este id para que um ETag de antes do restart nunca gere 304 falso
+ID_PROCESSO = uuid.uuid4().hex[:12]
+
+TIPOS = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _formato(params, headers):
+    formato = params.get('formato', [''])[0].lower()
+    if formato in TIPOS:
+        return formato
+    if 'text/csv' in headers.get('Accept', ''):
+        return 'csv'
+    return 'json'
+
+
+def _etag(snap, formato):
+    return f'"{ID_PROCESSO}-{snap.versao}-{formato}"'
+
+
+def _corresponde(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidatos = [c.strip().removeprefix('W/') for c in if_none_match.split(',')]
+    return etag in candidatos
+
+
+def _serializar(df, formato, envelope):
+    if formato == 'csv':
+        return df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
+
+    registros = df.to_json(orient='records', date_format='iso', force_ascii=False)
+    cabecalho = json.dumps(envelope, ensure_ascii=False)[:-1]
+    return f'{cabecalho}, "dados": {registros}}}'.encode('utf-8')
+
+
+def _resumo(snap):
+    total = len(snap.df)
+    registrados = int(snap.unidades['registrados'].sum()) if total else 0
+    return {
+        'versao': snap.versao,
+        'carregado_em': datetime.fromtimestamp(snap.carregado_em).isoformat(),
+        'total': total,
+        'registrados': registrados,
+        'nao_registrados': total - registrados,
+        'taxa': round(registrados / total * 100, 2) if total else 0,
+        'unidades': len(snap.unidades),
+    }
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        rotas = {
+            '/api/ramais': self._ramais,
+            '/api/unidades': self._unidades,
+            '/api/resumo': self._resumo,
+        }
+        rota = rotas.get(url.path.rstrip('/'))
+        if rota is None:
+            self.send_error(404)
+            return
+
+        # Opcional: se API_TOKEN estiver definido, exige "Authorization: Bearer <token>" (LGPD)
+        token = os.getenv('API_TOKEN', '')
+        if token and not hmac.compare_digest(
+            self.headers.get('Authorization', ''), f'Bearer {token}'
+        ):
+            self.send_error(401)
+            return
+
+        snap = snapshot.STORE.obter()
+        if snap is None:
+            self.send_response(503)
+            self.send_header('Retry-After', '30')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        params = parse_qs(url.query)
+        formato = _formato(params, self.headers)
+        if rota == self._resumo:
+            formato = 'json'
+
+        etag = _etag(snap, formato)
+        if _corresponde(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self._cabecalhos_cache(snap, etag)
+            self.end_headers()
+            return
+
+        corpo = rota(snap, params, formato)
+        self.send_response(200)
+        self.send_header('Content-Type', TIPOS[formato])
+        self.send_header('Content-Length', str(len(corpo)))
+        self._cabecalhos_cache(snap, etag)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _cabecalhos_cache(self, snap, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(snap.carregado_em, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Snapshot-Version', str(snap.versao))
+
+    def _ramais(self, snap, params, formato):
+        df = snapshot.filtrar_ramais(
+            snap.df,
+            unidade=params.get('unidade', ['Todas'])[0],
+            status=params.get('status', ['Todos'])[0],
+            busca=params.get('busca', [''])[0]
+        )
+        envelope = {'versao': snap.versao, 'total': len(df)}
+        return _serializar(df, formato, envelope)
+
+    def _unidades(self, snap, params, formato):
+        envelope = {'versao': snap.versao, 'total': len(snap.unidades)}
+        return _serializar(snap.unidades, formato, envelope)
+
+    def _resumo(self, snap, params, formato):
+        return json.dumps(_resumo(snap), ensure_ascii=False).encode('utf-8')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_api(porta=None, host=None):
+    """
+    Sobe a API de leitura (idempotente dentro do processo).
+
+    Fora de 127.0.0.1 só inicia com API_TOKEN definido.
+    """
+    porta = porta or int(os.getenv('API_PORT', '9109'))
+    host = host or os.getenv('API_HOST', HOST_PADRAO)
+    if host not in HOSTS_LOCAIS and not os.getenv('API_TOKEN'):
+        logger.error("API não iniciada: API_HOST=%s sem API_TOKEN exporia dados pessoais (LGPD)", host)
+        return None
+    return servidor.iniciar_em_thread('api', _ApiHandler, porta, host=host)
@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-from psycopg2 import pool
 from datetime import datetime
 
+import dados
+import painel
+import visoes
+
 # ============================================================================
 # CONFIGURAÇÕES
 # ============================================================================
@@ -20,42 +22,30 @@ st.set_page_config(
     }
 )
 
-# Esconder menu hamburger e footer do Streamlit
-hide_streamlit_style = """
-<style>
-#MainMenu {visibility: hidden;}
-footer {visibility: hidden;}
-header {visibility: hidden;}
-</style>
-"""
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
-
-COLORS = {
-    'primary': '#1e3a5f',
-    'secondary': '#5dade2',
-    'accent': '#3498db',
-    'success': '#4CAF50',
-    'danger': '#E57373'
-}
+COLORS = painel.COLORS
 
 # ============================================================================
 # CSS COMPLETO
 # ============================================================================
 
-def aplicar_css():
-    st.markdown(f"""
+CSS = f"""
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800;900&display=swap');
 
     * {{ font-family: 'Inter', sans-serif; }}
 
+    /* Esconder menu hamburger e footer do Streamlit */
+    #MainMenu {{visibility: hidden;}}
+    footer {{visibility: hidden;}}
+    header {{visibility: hidden;}}
+
     .stApp {{ 
         background: linear-gradient(135deg, #e8f4f8 0%, #d4e9f2 100%); 
     }}
 
     /* Esconder botões de ação do Streamlit */
     .stActionButton {{ display: none; }}
-    button[kind="header"] {{ display: none; }}
+    button[kind="header"], button[kind="headerNoPadding"] {{ display: none; }}
 
     .header-intercement {{
         background: linear-gradient(135deg, #1e3a5f 0%, #3498db 100%);
@@ -110,8 +100,23 @@ def aplicar_css():
         overflow: hidden;
         box-shadow: 0 4px 20px rgba(30, 58, 95, 0.1);
     }}
+
+    /* Os 4 cards em um único bloco HTML (um elemento por rerun em vez de 8) */
+    .metric-grid {{
+        display: grid;
+        grid-template-columns: repeat(4, minmax(0, 1fr));
+        gap: 1rem;
+    }}
+
+    @media (max-width: 640px) {{
+        .metric-grid {{ grid-template-columns: 1fr; }}
+    }}
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def aplicar_css():
+    """CSS montado uma vez no import (mesmo texto a cada rerun)"""
+    st.markdown(CSS, unsafe_allow_html=True)
 
 # ============================================================================
 # SPINNER PREMIUM
@@ -172,169 +177,81 @@ def show_loading():
     </style>
     """
 
-# ============================================================================
-# FUNÇÃO PARA NORMALIZAR BONAME
-# ============================================================================
-
-def normalizar_boname(nome):
-    if pd.isna(nome):
-        return ""
-    return str(nome).replace('_', ' ')
-
 # ============================================================================
 # BANCO DE DADOS - CONFIGURAÇÃO SEGURA (LGPD)
 # ============================================================================
 
-def get_db_config():
-    """
-    Busca credenciais APENAS do st.secrets
-    SEM fallback que exponha senhas no código
-    Conforme LGPD - Art. 46 (Segurança da Informação)
-    """
-    try:
-        return {
-            'host': st.secrets['DB_HOST'],
-            'database': st.secrets['DB_NAME'],
-            'user': st.secrets['DB_USER'],
-            'password': st.secrets['DB_PASSWORD'],
-            'port': st.secrets['DB_PORT'],
-            'connect_timeout': 10,
-            'keepalives': 1,
-            'keepalives_idle': 30,
-            'keepalives_interval': 10,
-            'keepalives_count': 5
-        }
-    except KeyError as e:
-        st.error(f"""
-        🔐 **Configuração de Secrets Ausente**
+# Motor de dados do processo (pool único e snapshot compartilhado com
+# pages/Base_Telco.py) e demais serviços: painel.iniciar_servicos.
+# Credenciais do st.secrets, SEM fallback que exponha senhas no código
+# Conforme LGPD - Art. 46 (Segurança da Informação)
+try:
+    motor = painel.iniciar_servicos(st.secrets)
+except dados.ErroConfiguracao as e:
+    st.error(f"""
+    🔐 **Configuração de Secrets Ausente**
 
-        A variável {str(e)} não foi configurada no Streamlit.
+    A variável {str(e)} não foi configurada no Streamlit.
 
-        **Como configurar:**
-        1. Vá em Settings → Secrets
-        2. Adicione as variáveis necessárias
-        """)
-        st.stop()
-
-QUERY_INTERCEMENT = """
-WITH latest_records AS (
-    SELECT DISTINCT ON (st.serviceid)
-        st.serviceid,
-        sl.boname,
-        sl.bglinename,
-        st.contactregstate,
-        st.lastsync
-    FROM osvsubscriberstatus st
-    INNER JOIN osvsubscriberlist sl ON st.subscriberid = sl.id
-    WHERE sl.bgname ILIKE '%intercement%'
-        AND st.lastsync::timestamp >= NOW() - INTERVAL '24 hours'
-    ORDER BY st.serviceid, st.lastsync::timestamp DESC
-)
-SELECT 
-    serviceid,
-    boname,
-    bglinename,
-    CASE 
-        WHEN contactregstate = 1 THEN 'Registrado'
-        ELSE 'Não Registrado'
-    END as status,
-    lastsync::timestamp as ultima_sincronizacao
-FROM latest_records
-ORDER BY boname, serviceid
-"""
+    **Como configurar:**
+    1. Vá em Settings → Secrets
+    2. Adicione as variáveis necessárias
+    """)
+    st.stop()
+
+cache_visoes = visoes.iniciar()
 
 # ============================================================================
 # FUNÇÕES DE DADOS - COM MELHOR TRATAMENTO DE ERROS
 # ============================================================================
 
-@st.cache_resource(ttl=600)
-def get_connection_pool():
-    """Cria pool de conexões PostgreSQL com tratamento robusto de erros"""
-    db_config = get_db_config()
-
-    try:
-        connection_pool = psycopg2.pool.SimpleConnectionPool(1, 3, **db_config)
-
-        # Testar se a conexão funciona
-        test_conn = connection_pool.getconn()
-        test_conn.close()
-        connection_pool.putconn(test_conn)
-
-        return connection_pool
-
-    except psycopg2.OperationalError as e:
-        error_msg = str(e).lower()
+MENSAGENS_CONEXAO = {
+    'timeout': """
+    ⚠️ **Tempo de Conexão Esgotado**
 
-        if "timeout" in error_msg or "timed out" in error_msg:
-            st.error("""
-            ⚠️ **Tempo de Conexão Esgotado**
+    O servidor de banco de dados não respondeu a tempo.
 
-            O servidor de banco de dados não respondeu a tempo.
+    **Possíveis causas:**
+    - Servidor em manutenção
+    - Firewall bloqueando conexão
+    - Rede instável
 
-            **Possíveis causas:**
-            - Servidor em manutenção
-            - Firewall bloqueando conexão
-            - Rede instável
+    **Solução:**
+    Aguarde alguns minutos e recarregue a página.
+    """,
+    'inacessivel': """
+    ❌ **Servidor Inacessível**
 
-            **Solução:**
-            Aguarde alguns minutos e recarregue a página.
-            """)
-        elif "could not connect" in error_msg or "connection refused" in error_msg:
-            st.error("""
-            ❌ **Servidor Inacessível**
+    Não foi possível estabelecer conexão com o banco de dados.
 
-            Não foi possível estabelecer conexão com o banco de dados.
+    **Ação necessária:**
+    Entre em contato com o suporte técnico da Base Telco.
+    """,
+    'autenticacao': """
+    🔐 **Erro de Autenticação**
 
-            **Ação necessária:**
-            Entre em contato com o suporte técnico da Base Telco.
-            """)
-        elif "authentication failed" in error_msg or "password" in error_msg:
-            st.error("""
-            🔐 **Erro de Autenticação**
+    As credenciais do banco de dados estão incorretas.
 
-            As credenciais do banco de dados estão incorretas.
-
-            **Ação necessária:**
-            Verifique as configurações em Settings → Secrets.
-            """)
-        else:
-            st.error(f"""
-            ❌ **Erro de Conexão**
-
-            Detalhes técnicos: {str(e)[:200]}
+    **Ação necessária:**
+    Verifique as configurações em Settings → Secrets.
+    """,
+}
 
-            Entre em contato com o suporte.
-            """)
-        return None
+def carregar_snapshot():
+    """Snapshot compartilhado dos ramais com tratamento de erros (em caso de falha, o último carregado ou None)"""
+    try:
+        return motor.obter_snapshot()
 
-    except Exception as e:
-        st.error(f"""
-        ❌ **Erro Inesperado**
+    except dados.ErroConexao as e:
+        st.error(MENSAGENS_CONEXAO.get(e.tipo) or f"""
+        ❌ **Erro de Conexão**
 
-        Ocorreu um erro ao conectar ao banco de dados.
+        Detalhes técnicos: {str(e)[:200]}
 
-        Detalhes: {str(e)[:200]}
+        Entre em contato com o suporte.
         """)
-        return None
 
-@st.cache_data(ttl=300)
-def get_ramais_intercement():
-    """Busca ramais da Intercement com tratamento de erros"""
-    pool = get_connection_pool()
-    if not pool:
-        return pd.DataFrame()
-
-    conn = None
-    try:
-        conn = pool.getconn()
-        df = pd.read_sql_query(QUERY_INTERCEMENT, conn)
-
-        if not df.empty and 'boname' in df.columns:
-            df['boname'] = df['boname'].apply(normalizar_boname)
-
-        return df
-
-    except psycopg2.Error as e:
+    except dados.ErroConsulta as e:
         st.error(f"""
         ❌ **Erro ao Buscar Dados**
 
@@ -342,18 +259,14 @@ def get_ramais_intercement():
 
         Detalhes: {str(e)[:200]}
         """)
-        return pd.DataFrame()
 
-    except Exception as e:
-        st.error(f"❌ Erro inesperado ao processar dados: {str(e)[:200]}")
-        return pd.DataFrame()
+    # Recarga falhou: segue com o último snapshot publicado, se houver
+    snap = motor.ultimo()
+    if snap is not None:
+        st.warning(f"⚠️ Exibindo os últimos dados carregados "
+                   f"({datetime.fromtimestamp(snap.carregado_em):%d/%m/%Y %H:%M:%S}).")
+    return snap
 
-    finally:
-        if conn:
-            try:
-                pool.putconn(conn)
-            except:
-                pass
 
 # ============================================================================
 # APLICAR CSS
@@ -381,10 +294,14 @@ st.markdown("""
 # ============================================================================
 
 loading_placeholder = st.empty()
-loading_placeholder.markdown(show_loading(), unsafe_allow_html=True)
+
+# Só quando o motor vai consultar o banco; com snapshot válido nada pisca
+if motor.vencido():
+    loading_placeholder.markdown(show_loading(), unsafe_allow_html=True)
 
 try:
-    df_ramais = get_ramais_intercement()
+    snap = carregar_snapshot()
+    df_ramais = snap.df if snap is not None else pd.DataFrame()
     loading_placeholder.empty()
 except Exception as e:
     loading_placeholder.empty()
@@ -396,30 +313,7 @@ except Exception as e:
 # ============================================================================
 
 if not df_ramais.empty:
-    total = len(df_ramais)
-    registrados = len(df_ramais[df_ramais['status'] == 'Registrado'])
-    nao_registrados = len(df_ramais[df_ramais['status'] == 'Não Registrado'])
-    taxa = round((registrados / total * 100), 2) if total > 0 else 0
-
-    cols = st.columns(4)
-
-    cards = [
-        ("📊", "Total de Ramais", total, COLORS['primary']),
-        ("✅", "Registrados", registrados, COLORS['success']),
-        ("❌", "Não Registrados", nao_registrados, COLORS['danger']),
-        ("📈", "Taxa de Registro", f"{taxa}%", COLORS['accent'])
-    ]
-
-    for i, (icon, label, value, cor) in enumerate(cards):
-        with cols[i]:
-            valor_formatado = f"{value:,}".replace(',', '.') if isinstance(value, int) else value
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-icon" style="color: {cor}">{icon}</div>
-                <div class="metric-value" style="color: {cor}">{valor_formatado}</div>
-                <div class="metric-label">{label}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    st.markdown(painel.html_cards(snap.versao, snap.df), unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -433,7 +327,7 @@ if not df_ramais.empty:
     col_unidade, col_status, col_search = st.columns([2, 1, 2])
 
     with col_unidade:
-        unidades_disponiveis = ['Todas'] + sorted(df_ramais['boname'].dropna().unique().tolist())
+        unidades_disponiveis = ['Todas'] + snap.unidades['boname'].tolist()
         unidade_filter = st.selectbox(
             "🏢 Filtrar por Unidade",
             options=unidades_disponiveis,
@@ -455,26 +349,10 @@ if not df_ramais.empty:
             key='search_ramais'
         )
 
-    df_filtered = df_ramais.copy()
-
-    if unidade_filter != 'Todas':
-        df_filtered = df_filtered[df_filtered['boname'] == unidade_filter]
-
-    if status_filter != 'Todos':
-        df_filtered = df_filtered[df_filtered['status'] == status_filter]
-
-    if search_term:
-        df_filtered = df_filtered[
-            df_filtered['bglinename'].astype(str).str.contains(search_term, case=False, na=False) |
-            df_filtered['serviceid'].astype(str).str.contains(search_term, case=False, na=False)
-        ]
-
-    df_display = df_filtered.copy()
-    df_display = df_display[['boname', 'bglinename', 'serviceid', 'status']]
-    df_display.columns = ['Unidade', 'Usuário', 'Ramal', 'Status']
+    visao = cache_visoes.obter(snap, unidade_filter, status_filter, search_term)
 
     st.dataframe(
-        df_display,
+        visao.exibicao,
         use_container_width=True,
         hide_index=True,
         height=550,
@@ -486,18 +364,12 @@ if not df_ramais.empty:
         }
     )
 
-    st.caption(f"📊 Exibindo {len(df_filtered):,} de {len(df_ramais):,} ramais".replace(',', '.'))
+    st.caption(f"📊 Exibindo {visao.linhas:,} de {len(snap.df):,} ramais".replace(',', '.'))
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    csv = df_filtered.to_csv(index=False, encoding='utf-8-sig')
-    st.download_button(
-        "📥 Baixar Dados (CSV)",
-        csv,
-        f"intercement_ramais_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        "text/csv",
-        use_container_width=False
-    )
+    painel.botao_csv(cache_visoes, snap, unidade_filter, status_filter, search_term,
+                     "📥 Baixar Dados (CSV)", use_container_width=False)
 
 else:
     st.warning("⚠️ Nenhum dado disponível no momento. Por favor, tente novamente mais tarde.")
@@ -0,0 +1 @@
+"""Benchmarks do caminho de dados (veja bench/executar.py)."""
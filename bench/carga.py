@@ -0,0 +1,303 @@
+"""
+Teste de carga com várias sessões simultâneas das páginas do painel.
+
+Cada sessão é um AppTest (streamlit.testing.v1) rodando em uma thread do
+mesmo processo, com um único runtime simulado, então caches (st.cache_data /
+st.cache_resource), pool de conexões e contadores de metricas.py são
+compartilhados como no servidor real. O banco é um PostgreSQL local populado por bench.gerar_dados.
+
+Interações roteirizadas por sessão: troca de unidade, troca de status,
+digitação na busca (um rerun por tecla), atualização (botão em Base_Telco,
+recarga da página em app.py) e download (clique em "Preparar CSV", que gera
+o CSV da visão; o AppTest não clica no download_button em si).
+
+Relatório: percentis de latência dos reruns, consultas ao banco, pool
+(pico de conexões em uso, PoolError por pool esgotado e tempo de getconn,
+que é abertura de conexão e não fila: o pool não espera) e pico de RSS.
+
+Uso:
+    python -m bench.carga --dsn postgresql://localhost/ramais_bench --app app.py --sessoes 30
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+from urllib import parse
+
+import psycopg2
+import streamlit as st
+from streamlit import source_util
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+import dados
+import metricas
+from bench import executar, gerar_dados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PESOS_INTERACOES = {
+    'unidade': 3,
+    'status': 2,
+    'busca': 3,
+    'atualizar': 1,
+    'download': 1,
+}
+
+TERMOS_BUSCA = ['silva', 'ana', '5500', 'recep', 'costa']
+
+
+def configurar_banco(dsn):
+    """Aponta o motor de dados (st.secrets e variáveis de ambiente) para o banco local."""
+    config = executar.config_do_dsn(dsn)
+    os.environ.update(config)
+
+    # Definido uma vez para o processo, em vez de secrets por AppTest
+    secrets = Secrets([])
+    secrets._secrets = config
+    st.secrets = secrets
+
+
+def instalar_runtime():
+    """Runtime simulado único para o processo, como no servidor real."""
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+
+class SessaoAppTest(AppTest):
+    """
+    AppTest que pode rodar em paralelo com outras instâncias.
+
+    O AppTest original cria e descarta Runtime._instance a cada run; com
+    várias threads, uma sessão derruba o runtime de outra no meio do rerun.
+    Aqui o runtime é instalado uma vez (instalar_runtime) e só o script roda.
+    """
+
+    def _run(self, widget_state=None, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+
+        script_runner = LocalScriptRunner(
+            self._script_path, self.session_state, args=self.args, kwargs=self.kwargs
+        )
+        self._tree = script_runner.run(widget_state, self.query_params, timeout)
+        self._tree._runner = self
+        query_string = script_runner.event_data[-1]["client_state"].query_string
+        self.query_params = parse.parse_qs(query_string)
+        return self
+
+
+def botao(at, texto):
+    return next((b for b in at.button if texto in str(b.label)), None)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Sessao:
+    def __init__(self, app, interacoes, pausa, timeout, semente):
+        self.app = app
+        self.interacoes = interacoes
+        self.pausa = pausa
+        self.timeout = timeout
+        self.aleatorio = random.Random(semente)
+        self.medidas = []
+
+    def _nova(self):
+        return SessaoAppTest(os.path.join(RAIZ, self.app), default_timeout=self.timeout)
+
+    def _rerun(self, tipo, executar):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            at = executar()
+            if at.exception:
+                erro = at.exception[0].message
+            elif at.error:
+                erro = at.error[0].value
+        except Exception as e:
+            at = None
+            erro = str(e)
+        self.medidas.append((tipo, time.perf_counter() - inicio, erro))
+        return at
+
+    def executar(self):
+        at = self._rerun('inicial', lambda: self._nova().run())
+
+        for _ in range(self.interacoes):
+            if at is None or not at.selectbox:
+                at = self._rerun('inicial', lambda: self._nova().run())
+                continue
+
+            time.sleep(self.aleatorio.uniform(0, self.pausa))
+            tipo = self.aleatorio.choices(list(PESOS_INTERACOES), list(PESOS_INTERACOES.values()))[0]
+
+            if tipo == 'unidade':
+                opcao = self.aleatorio.choice(at.selectbox[0].options)
+                at = self._rerun(tipo, lambda: at.selectbox[0].select(opcao).run())
+            elif tipo == 'status':
+                opcao = self.aleatorio.choice(at.selectbox[1].options)
+                at = self._rerun(tipo, lambda: at.selectbox[1].select(opcao).run())
+            elif tipo == 'busca':
+                termo = self.aleatorio.choice(TERMOS_BUSCA)
+                for tamanho in range(1, len(termo) + 1):
+                    at = self._rerun(tipo, lambda: at.text_input[0].input(termo[:tamanho]).run())
+                    if at is None:
+                        break
+                    time.sleep(self.aleatorio.uniform(0, 0.2))
+                if at is not None:
+                    at = self._rerun(tipo, lambda: at.text_input[0].input('').run())
+            elif tipo == 'atualizar':
+                atualizar = botao(at, 'Atualizar')
+                if atualizar is not None:
+                    at = self._rerun(tipo, lambda: atualizar.click().run())
+                else:
+                    at = self._rerun(tipo, lambda: self._nova().run())
+            else:
+                preparar = botao(at, 'Preparar CSV')
+                if preparar is not None:
+                    at = self._rerun(tipo, lambda: preparar.click().run())
+                else:
+                    at = self._rerun(tipo, lambda: at.run())
+
+
+def executar_carga(app, sessoes, interacoes, pausa, timeout, semente=42):
+    # Cada app começa a frio, sem aproveitar caches da rodada anterior. O
+    # cache de páginas guarda o script principal; sem limpá-lo, a segunda
+    # rodada executaria o app da primeira.
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    dados.MOTOR.invalidar()
+    with source_util._pages_cache_lock:
+        source_util._cached_pages = None
+
+    consultas_antes = metricas.REGISTRO.valor('ramais_cache_misses_total')
+    getconn_antes, conexoes_antes = metricas.REGISTRO.histograma('ramais_pool_getconn_seconds')
+    esgotado_antes = metricas.REGISTRO.valor('ramais_db_connection_errors_total', motivo='pool_esgotado')
+    metricas.zerar_pico_pool()
+
+    grupo = [Sessao(app, interacoes, pausa, timeout, semente + i) for i in range(sessoes)]
+    threads = [threading.Thread(target=s.executar, name=f"sessao-{i}") for i, s in enumerate(grupo)]
+
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    medidas = [m for s in grupo for m in s.medidas]
+    getconn, conexoes = metricas.REGISTRO.histograma('ramais_pool_getconn_seconds')
+
+    def resumo(latencias):
+        return {
+            'reruns': len(latencias),
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'p90_ms': percentil(latencias, 90) * 1000,
+            'p99_ms': percentil(latencias, 99) * 1000,
+            'max_ms': max(latencias, default=0) * 1000,
+        }
+
+    por_tipo = {}
+    for tipo, latencia, _ in medidas:
+        por_tipo.setdefault(tipo, []).append(latencia)
+
+    erros = [erro for _, _, erro in medidas if erro]
+    return {
+        'app': app,
+        'sessoes': sessoes,
+        'duracao_s': duracao,
+        'geral': resumo([latencia for _, latencia, _ in medidas]),
+        'por_interacao': {tipo: resumo(latencias) for tipo, latencias in por_tipo.items()},
+        'consultas_banco': metricas.REGISTRO.valor('ramais_cache_misses_total') - consultas_antes,
+        'pool': {
+            'conexoes_obtidas': conexoes - conexoes_antes,
+            'pico_em_uso': metricas.pico_pool(),
+            'pool_esgotado': metricas.REGISTRO.valor('ramais_db_connection_errors_total', motivo='pool_esgotado')
+                             - esgotado_antes,
+            'getconn_medio_ms': (getconn - getconn_antes) / (conexoes - conexoes_antes) * 1000
+                                if conexoes > conexoes_antes else 0,
+        },
+        'erros': len(erros),
+        'exemplos_erro': sorted(set(e[:200] for e in erros))[:5],
+        # ru_maxrss é em KB no Linux
+        'pico_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def imprimir(resultado):
+    print(f"\n{resultado['app']}: {resultado['sessoes']} sessões em {resultado['duracao_s']:.1f}s")
+    linhas = [('geral', resultado['geral'])] + sorted(resultado['por_interacao'].items())
+    for nome, r in linhas:
+        print(f"  {nome:<10} {r['reruns']:6d} reruns  p50 {r['p50_ms']:8.1f}  p90 {r['p90_ms']:8.1f}  "
+              f"p99 {r['p99_ms']:8.1f}  max {r['max_ms']:8.1f} ms")
+    pool = resultado['pool']
+    print(f"  consultas ao banco: {resultado['consultas_banco']:.0f}")
+    print(f"  pool: {pool['conexoes_obtidas']} getconn ({pool['getconn_medio_ms']:.2f} ms em média), "
+          f"pico {pool['pico_em_uso']} em uso, {pool['pool_esgotado']} PoolError")
+    print(f"  erros: {resultado['erros']}  pico RSS: {resultado['pico_rss_mb']:.0f} MB")
+    for exemplo in resultado['exemplos_erro']:
+        print(f"    - {exemplo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DSN'), help="PostgreSQL local (ou BENCH_DSN)")
+    parser.add_argument('--app', default='app.py,pages/Base_Telco.py', help="scripts separados por vírgula")
+    parser.add_argument('--sessoes', type=int, default=20)
+    parser.add_argument('--interacoes', type=int, default=10, help="interações por sessão")
+    parser.add_argument('--pausa', type=float, default=1.0, help="pausa máxima entre interações (s)")
+    parser.add_argument('--timeout', type=float, default=120, help="timeout de cada rerun (s)")
+    parser.add_argument('--gerar', type=int,
+                        help="apaga e recria as tabelas com N ramais antes de começar (só em banco de bench)")
+    parser.add_argument('--saida', help="grava o relatório neste JSON")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("informe --dsn ou BENCH_DSN")
+
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    configurar_banco(args.dsn)
+    instalar_runtime()
+
+    if args.gerar:
+        conn = psycopg2.connect(args.dsn)
+        try:
+            gerar_dados.gerar(conn, args.gerar)
+        except RuntimeError as e:
+            parser.error(str(e))
+        finally:
+            conn.close()
+
+    resultados = []
+    for app in args.app.split(','):
+        resultado = executar_carga(app.strip(), args.sessoes, args.interacoes, args.pausa, args.timeout)
+        imprimir(resultado)
+        resultados.append(resultado)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
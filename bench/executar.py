@@ -0,0 +1,257 @@
+"""
+Benchmarks do caminho de dados completo, etapa por etapa.
+
+Mede os dados já carregados no banco ou, com --recriar, gera os dados
+sintéticos de cada tamanho (bench.gerar_dados, que apaga e recria as
+tabelas e só aceita banco com "bench" no nome) e mede separadamente:
+
+    consulta             QUERY_INTERCEMENT via pandas (sem normalização)
+    get_ramais           caminho de dados.Motor.buscar sem snapshot
+                         (getconn + consulta + normalização)
+    get_ramais_shards_N  o mesmo em N shards paralelos (--shards, DB_FETCH_SHARDS)
+    snapshot_hit         dados.Motor.obter_snapshot() com snapshot válido
+    visao_hit            visoes.CacheVisoes.obter() de uma visão já calculada
+    normalizacao         normalizar_unidades sobre o resultado bruto
+    filtro_*             cadeia unidade/status/busca + projeção da tabela
+    metricas             cards e agregados por unidade
+    csv                  exportação do download
+
+Uso:
+    python -m bench.executar --dsn postgresql://localhost/ramais_bench --recriar --saida bench/baseline.json
+    python -m bench.executar --dsn ... --comparar bench/baseline.json
+
+Com --comparar, sai com código 1 se alguma etapa ficar mais lenta que a
+linha de base além da tolerância.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import pool
+
+import consulta
+import dados
+import snapshot
+import visoes
+from bench import gerar_dados
+
+TAMANHOS_PADRAO = (10_000, 100_000, 1_000_000)
+# Chave dos resultados quando os dados já estavam no banco (sem --recriar)
+RODADA_EXISTENTE = 'existente'
+
+# Diferenças abaixo disso são ruído de medição, não regressão
+PISO_REGRESSAO_SEGUNDOS = 0.002
+
+
+def config_do_dsn(dsn):
+    """Chaves DB_* (como em st.secrets / .env) a partir de um DSN do PostgreSQL."""
+    partes = psycopg2.extensions.parse_dsn(dsn)
+    return {
+        'DB_HOST': partes.get('host', 'localhost'),
+        'DB_NAME': partes.get('dbname', 'postgres'),
+        'DB_USER': partes.get('user', 'postgres'),
+        'DB_PASSWORD': partes.get('password', ''),
+        'DB_PORT': partes.get('port', '5432'),
+    }
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'mediana': statistics.median(tempos),
+        'min': min(tempos),
+        'max': max(tempos),
+    }
+
+
+def _cenarios_filtro(df):
+    maior_unidade = df['boname'].value_counts().index[0] if not df.empty else 'Todas'
+    return {
+        'filtro_todas': ('Todas', 'Todos', ''),
+        'filtro_unidade': (maior_unidade, 'Todos', ''),
+        'filtro_status': ('Todas', snapshot.STATUS_NAO_REGISTRADO, ''),
+        'filtro_busca': ('Todas', 'Todos', 'silva'),
+        'filtro_combinado': (maior_unidade, snapshot.STATUS_REGISTRADO, '55'),
+    }
+
+
+def executar_etapas(connection_pool, dsn, repeticoes, shards=()):
+    conn = connection_pool.getconn()
+    try:
+        bruto = pd.read_sql_query(consulta.QUERY_INTERCEMENT, conn)
+        etapas = {
+            'consulta': medir(lambda: pd.read_sql_query(consulta.QUERY_INTERCEMENT, conn), repeticoes),
+        }
+    finally:
+        connection_pool.putconn(conn)
+
+    def get_ramais():
+        conn = connection_pool.getconn()
+        try:
+            return consulta.buscar_ramais(conn)
+        finally:
+            connection_pool.putconn(conn)
+
+    etapas['get_ramais'] = medir(get_ramais, repeticoes)
+
+    def get_ramais_shards(total):
+        conns = [connection_pool.getconn() for _ in range(total)]
+        try:
+            return dados.buscar_em_shards(conns)
+        finally:
+            for conn in conns:
+                connection_pool.putconn(conn)
+
+    for total in shards:
+        etapas[f'get_ramais_shards_{total}'] = medir(lambda: get_ramais_shards(total), repeticoes)
+
+    df = consulta.normalizar_unidades(bruto.copy())
+
+    motor = dados.Motor(ttl=3600)
+    motor.configurar(config_do_dsn(dsn))
+    try:
+        snap = motor.obter_snapshot()
+        etapas['snapshot_hit'] = medir(motor.obter_snapshot, repeticoes)
+    finally:
+        motor.pool().closeall()
+
+    cache = visoes.CacheVisoes(visoes.ORCAMENTO_PADRAO_MB * 1024 * 1024)
+    cache.obter(snap, 'Todas', 'Todos', '')
+    etapas['visao_hit'] = medir(lambda: cache.obter(snap, 'Todas', 'Todos', ''), repeticoes)
+    etapas['normalizacao'] = medir(lambda: consulta.normalizar_unidades(bruto.copy()), repeticoes)
+
+    for nome, (unidade, status, busca) in _cenarios_filtro(df).items():
+        etapas[nome] = medir(
+            lambda: snapshot.projetar_exibicao(snapshot.filtrar_ramais(df, unidade, status, busca)),
+            repeticoes
+        )
+
+    etapas['metricas'] = medir(
+        lambda: (snapshot.calcular_totais(df), snapshot.agregar_por_unidade(df)),
+        repeticoes
+    )
+    etapas['csv'] = medir(lambda: df.to_csv(index=False, encoding='utf-8-sig'), repeticoes)
+
+    return len(df), etapas
+
+
+def comparar(atual, base, tolerancia):
+    """Lista de (tamanho, etapa, base, atual) que regrediram."""
+    regressoes = []
+    for tamanho, resultado in atual['resultados'].items():
+        resultado_base = base['resultados'].get(tamanho, {})
+        linhas_base = resultado_base.get('linhas')
+        if linhas_base and abs(resultado['linhas'] - linhas_base) > 0.05 * linhas_base:
+            print(f"AVISO {tamanho}: {resultado['linhas']} linhas contra {linhas_base} na base; não comparado")
+            continue
+
+        etapas_base = resultado_base.get('etapas', {})
+        for etapa, medida in resultado['etapas'].items():
+            if etapa not in etapas_base:
+                continue
+            antes = etapas_base[etapa]['mediana']
+            agora = medida['mediana']
+            if agora > antes * (1 + tolerancia) and agora - antes > PISO_REGRESSAO_SEGUNDOS:
+                regressoes.append((tamanho, etapa, antes, agora))
+    return regressoes
+
+
+def imprimir(resultados, base=None):
+    for tamanho, resultado in resultados['resultados'].items():
+        rotulo = "dados existentes" if tamanho == RODADA_EXISTENTE else f"{int(tamanho):,} ramais"
+        print(f"\n{rotulo} ({resultado['linhas']:,} linhas)".replace(',', '.'))
+        etapas_base = (base or {}).get('resultados', {}).get(tamanho, {}).get('etapas', {})
+        for etapa, medida in resultado['etapas'].items():
+            linha = f"  {etapa:<18} {medida['mediana'] * 1000:10.2f} ms"
+            if etapa in etapas_base:
+                antes = etapas_base[etapa]['mediana']
+                variacao = (medida['mediana'] / antes - 1) * 100 if antes else 0
+                linha += f"   base {antes * 1000:10.2f} ms  ({variacao:+.1f}%)"
+            print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DSN'), help="PostgreSQL local (ou BENCH_DSN)")
+    parser.add_argument('--tamanhos', help="com --recriar, ramais gerados por rodada "
+                                           f"(padrão {','.join(str(t) for t in TAMANHOS_PADRAO)})")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--shards', default='', help="números de shards a medir, ex.: 2,4,8")
+    parser.add_argument('--recriar', action='store_true',
+                        help="apaga e recria as tabelas com dados sintéticos (só em banco de bench)")
+    parser.add_argument('--saida', help="grava os resultados neste JSON (linha de base)")
+    parser.add_argument('--comparar', help="JSON de linha de base para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.15, help="fração aceita acima da base")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("informe --dsn ou BENCH_DSN")
+
+    if args.tamanhos and not args.recriar:
+        parser.error("--tamanhos só vale com --recriar")
+    if args.recriar:
+        tamanhos = [int(t) for t in (args.tamanhos or ','.join(str(t) for t in TAMANHOS_PADRAO)).split(',')]
+    else:
+        tamanhos = [None]
+    shards = [int(s) for s in args.shards.split(',') if s]
+    connection_pool = pool.ThreadedConnectionPool(1, max([2] + shards), args.dsn)
+
+    resultados = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'psycopg2': psycopg2.__version__,
+        'resultados': {},
+    }
+
+    try:
+        for tamanho in tamanhos:
+            if tamanho is not None:
+                conn = connection_pool.getconn()
+                try:
+                    gerar_dados.gerar(conn, tamanho)
+                except RuntimeError as e:
+                    parser.error(str(e))
+                finally:
+                    connection_pool.putconn(conn)
+
+            linhas, etapas = executar_etapas(connection_pool, args.dsn, args.repeticoes, shards)
+            chave = str(tamanho) if tamanho is not None else RODADA_EXISTENTE
+            resultados['resultados'][chave] = {'linhas': linhas, 'etapas': etapas}
+    finally:
+        connection_pool.closeall()
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+
+    imprimir(resultados, base)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    if base is not None:
+        regressoes = comparar(resultados, base, args.tolerancia)
+        for tamanho, etapa, antes, agora in regressoes:
+            print(f"REGRESSÃO {tamanho}/{etapa}: {antes * 1000:.2f} ms -> {agora * 1000:.2f} ms")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
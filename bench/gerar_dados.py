@@ -0,0 +1,178 @@
+"""
+Gera dados sintéticos em um PostgreSQL local para os benchmarks.
+
+Cria (recria) osvsubscriberlist e osvsubscriberstatus com distribuições
+parecidas com as de produção. São os nomes das tabelas reais: por isso só
+roda em banco cujo nome contenha "bench" (verificar_banco).
+
+- bgname: maioria de grupos de outros clientes (o ILIKE '%intercement%'
+  precisa descartá-los) e algumas grafias de Intercement;
+- boname: poucas unidades grandes e uma cauda longa (Zipf), com '_' no nome
+  para exercitar a normalização;
+- bglinename: nome + sobrenome, com repetição;
+- várias linhas de lastsync por serviceid, parte fora da janela de 24h.
+
+Uso:
+    python -m bench.gerar_dados --dsn postgresql://localhost/ramais_bench --ramais 100000
+"""
+
+import argparse
+import io
+import os
+import random
+from datetime import datetime, timedelta
+
+import psycopg2
+
+GRUPOS_INTERCEMENT = ['INTERCEMENT', 'InterCement_Brasil', 'INTERCEMENT_PARTICIPACOES']
+GRUPOS_OUTROS = [
+    'VOTORANTIM_CIMENTOS', 'GRUPO_PAO', 'LOGISTICA_NORTE', 'HOSPITAL_CENTRAL',
+    'BANCO_REGIONAL', 'TRANSPORTES_SUL', 'ENERGIA_LESTE', 'PREFEITURA_MUNICIPAL'
+]
+
+UNIDADES = [
+    'SEDE_SAO_PAULO', 'FABRICA_CAJATI', 'FABRICA_APIAI', 'FABRICA_IJACI',
+    'FABRICA_CANDIOTA', 'FABRICA_BRUMADO', 'FABRICA_JOAO_PESSOA', 'FABRICA_CAMPO_FORMOSO',
+    'FABRICA_PEDRO_LEOPOLDO', 'FABRICA_NOVA_SANTA_RITA', 'FABRICA_SANTANA_DO_PARAISO',
+    'CD_JACAREI', 'CD_CUIABA', 'CD_RECIFE', 'CD_SALVADOR', 'CD_PORTO_ALEGRE',
+    'ESCRITORIO_RIO', 'ESCRITORIO_BH', 'ESCRITORIO_CURITIBA', 'ESCRITORIO_BRASILIA',
+    'LABORATORIO_CENTRAL', 'MINERACAO_ITAU', 'MINERACAO_BODOQUENA', 'PORTO_SANTOS',
+    'TERMINAL_PARANAGUA', 'CENTRAL_ATENDIMENTO', 'TI_DATACENTER', 'RH_CORPORATIVO',
+    'JURIDICO', 'SUPRIMENTOS', 'CONTROLADORIA', 'MARKETING', 'VENDAS_SUL', 'VENDAS_NORDESTE',
+    'VENDAS_CENTRO_OESTE', 'MANUTENCAO', 'SEGURANCA_PATRIMONIAL', 'PORTARIA',
+]
+
+NOMES = [
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique',
+    'Isabela', 'João', 'Karina', 'Lucas', 'Mariana', 'Nelson', 'Olívia', 'Paulo',
+    'Rafaela', 'Sérgio', 'Tatiane', 'Vinícius', 'Recepção', 'Portaria', 'Sala'
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Costa',
+    'Rodrigues', 'Almeida', 'Nascimento', 'Carvalho', 'Araújo', 'Ribeiro', 'Reunião'
+]
+
+# As tabelas recriadas têm os nomes de produção; o banco precisa ter esta marca no nome
+MARCA_BANCO_BENCH = 'bench'
+
+DDL = """
+DROP TABLE IF EXISTS osvsubscriberstatus;
+DROP TABLE IF EXISTS osvsubscriberlist;
+
+CREATE TABLE osvsubscriberlist (
+    id integer PRIMARY KEY,
+    bgname text,
+    boname text,
+    bglinename text
+);
+
+CREATE TABLE osvsubscriberstatus (
+    subscriberid integer,
+    serviceid text,
+    contactregstate integer,
+    lastsync text
+);
+"""
+
+INDICES = """
+CREATE INDEX ON osvsubscriberstatus (subscriberid);
+CREATE INDEX ON osvsubscriberstatus (serviceid);
+"""
+
+
+def _pesos_zipf(n, s=1.1):
+    return [1 / (i ** s) for i in range(1, n + 1)]
+
+
+def _copiar(cursor, tabela, colunas, linhas, lote=200_000):
+    buffer = io.StringIO()
+    for i, linha in enumerate(linhas, 1):
+        buffer.write("\t".join(linha) + "\n")
+        if i % lote == 0:
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN", buffer)
+            buffer = io.StringIO()
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN", buffer)
+
+
+def verificar_banco(conn):
+    """Recusa (RuntimeError) bancos que não sejam claramente de benchmark."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT current_database()")
+        nome = cursor.fetchone()[0]
+    if MARCA_BANCO_BENCH not in nome.lower():
+        raise RuntimeError(
+            f"banco '{nome}' recusado: gerar_dados apaga osvsubscriberlist e osvsubscriberstatus "
+            f"e só roda em banco cujo nome contenha '{MARCA_BANCO_BENCH}'")
+
+
+def gerar(conn, ramais, outros_por_ramal=1.5, syncs_por_ramal=3, semente=42):
+    """
+    Popula as tabelas com `ramais` serviceids da Intercement.
+
+    `outros_por_ramal` controla quantos assinantes de outros grupos existem
+    para cada ramal Intercement; `syncs_por_ramal` é a média de linhas de
+    osvsubscriberstatus por serviceid.
+    """
+    verificar_banco(conn)
+    aleatorio = random.Random(semente)
+    pesos_unidades = _pesos_zipf(len(UNIDADES))
+    total = ramais + int(ramais * outros_por_ramal)
+    agora = datetime.now()
+
+    assinantes = []
+    for sid in range(1, total + 1):
+        if sid <= ramais:
+            bgname = aleatorio.choice(GRUPOS_INTERCEMENT)
+        else:
+            bgname = aleatorio.choice(GRUPOS_OUTROS)
+        boname = aleatorio.choices(UNIDADES, pesos_unidades)[0]
+        usuario = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}"
+        assinantes.append((str(sid), bgname, boname, usuario))
+
+    def status():
+        for sid in range(1, total + 1):
+            serviceid = f"55{sid:010d}"
+            registrado = aleatorio.random() < 0.85
+            for _ in range(aleatorio.randint(1, 2 * syncs_por_ramal - 1)):
+                # ~10% das sincronizações caem fora da janela de 24h
+                horas = aleatorio.uniform(0, 26.4)
+                lastsync = (agora - timedelta(hours=horas)).strftime('%Y-%m-%d %H:%M:%S')
+                estado = '1' if registrado or aleatorio.random() < 0.3 else '0'
+                yield (str(sid), serviceid, estado, lastsync)
+
+    with conn.cursor() as cursor:
+        cursor.execute(DDL)
+        _copiar(cursor, 'osvsubscriberlist', 'id, bgname, boname, bglinename', assinantes)
+        _copiar(cursor, 'osvsubscriberstatus', 'subscriberid, serviceid, contactregstate, lastsync', status())
+        cursor.execute(INDICES)
+        cursor.execute("ANALYZE osvsubscriberlist")
+        cursor.execute("ANALYZE osvsubscriberstatus")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DSN'), help="PostgreSQL local (ou BENCH_DSN)")
+    parser.add_argument('--ramais', type=int, default=10_000)
+    parser.add_argument('--outros-por-ramal', type=float, default=1.5)
+    parser.add_argument('--syncs-por-ramal', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("informe --dsn ou BENCH_DSN")
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        gerar(conn, args.ramais, args.outros_por_ramal, args.syncs_por_ramal, args.semente)
+    except RuntimeError as e:
+        parser.error(str(e))
+    finally:
+        conn.close()
+    print(f"{args.ramais:,} ramais gerados".replace(',', '.'))
+
+
+if __name__ == '__main__':
+    main()
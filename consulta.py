@@ -0,0 +1,99 @@
+"""
+Consulta dos ramais da Intercement.
+
+Compartilhada pelo motor de dados (dados.py) e pelos benchmarks, para que todos meçam e
+executem exatamente o mesmo SQL e a mesma normalização.
+"""
+
+import pandas as pd
+
+# Limite no servidor para qualquer comando destas conexões: um plano ruim
+# é cancelado pelo PostgreSQL em vez de prender uma conexão do pool
+STATEMENT_TIMEOUT_MS_PADRAO = 30000
+
+# Query: Garantir ramais únicos (1 por serviceid)
+QUERY_INTERCEMENT = """
+WITH latest_records AS (
+    SELECT DISTINCT ON (st.serviceid)
+        st.serviceid,
+        sl.boname,
+        sl.bglinename,
+        st.contactregstate,
+        st.lastsync
+    FROM osvsubscriberstatus st
+    INNER JOIN osvsubscriberlist sl ON st.subscriberid = sl.id
+    WHERE sl.bgname ILIKE '%intercement%'
+        AND st.lastsync::timestamp >= NOW() - INTERVAL '24 hours'
+    ORDER BY st.serviceid, st.lastsync::timestamp DESC
+)
+SELECT
+    serviceid,
+    boname,
+    bglinename,
+    CASE
+        WHEN contactregstate = 1 THEN 'Registrado'
+        ELSE 'Não Registrado'
+    END as status,
+    lastsync::timestamp as ultima_sincronizacao
+FROM latest_records
+ORDER BY boname, serviceid
+"""
+
+# Modo paralelo (DB_FETCH_SHARDS > 1): a mesma consulta restrita a uma faixa
+# do hash de serviceid. Como o DISTINCT ON é por serviceid, cada ramal cai
+# inteiro em um único shard e a união dos shards tem as mesmas linhas do
+# resultado serial (a ordem pode diferir, ver juntar_shards).
+_FILTRO_PERIODO = "        AND st.lastsync::timestamp >= NOW() - INTERVAL '24 hours'\n"
+_PREDICADO_SHARD = "        AND (hashtext(st.serviceid::text) & 2147483647) %% %(total)s = %(shard)s\n"
+QUERY_INTERCEMENT_SHARD = QUERY_INTERCEMENT.replace('%', '%%').replace(
+    _FILTRO_PERIODO, _FILTRO_PERIODO + _PREDICADO_SHARD)
+
+# Se QUERY_INTERCEMENT mudar o filtro de período, o replace acima não acha
+# nada e cada shard traria a base inteira: melhor falhar ao importar
+if _PREDICADO_SHARD not in QUERY_INTERCEMENT_SHARD:
+    raise RuntimeError("QUERY_INTERCEMENT_SHARD sem o predicado de shard: _FILTRO_PERIODO não bate com QUERY_INTERCEMENT")
+
+COLUNAS_ORDEM = ['boname', 'serviceid']
+
+
+def opcoes_conexao(statement_timeout_ms=None):
+    """Valor de `options` do psycopg2 com o statement_timeout da sessão."""
+    timeout = int(statement_timeout_ms or STATEMENT_TIMEOUT_MS_PADRAO)
+    return f"-c statement_timeout={timeout}"
+
+
+def normalizar_boname(nome):
+    """Substitui _ por espaço"""
+    if pd.isna(nome):
+        return ""
+    return str(nome).replace('_', ' ')
+
+
+def normalizar_unidades(df):
+    if not df.empty and 'boname' in df.columns:
+        df['boname'] = df['boname'].apply(normalizar_boname)
+    return df
+
+
+def buscar_ramais(conn):
+    """Executa QUERY_INTERCEMENT na conexão e devolve o DataFrame normalizado."""
+    df = pd.read_sql_query(QUERY_INTERCEMENT, conn)
+    return normalizar_unidades(df)
+
+
+def buscar_shard(conn, shard, total):
+    """Linhas do shard `shard` de `total` (sem normalização)."""
+    return pd.read_sql_query(QUERY_INTERCEMENT_SHARD, conn, params={'shard': shard, 'total': total})
+
+
+def juntar_shards(partes):
+    """
+    Une os shards e normaliza.
+
+    As linhas são as mesmas da consulta serial, mas a ordenação por boname,
+    serviceid é a do pandas (ponto de código), não a collation do banco:
+    acentos e maiúsculas podem vir em outra ordem.
+    """
+    df = pd.concat(partes, ignore_index=True)
+    df = df.sort_values(COLUNAS_ORDEM, kind='mergesort', ignore_index=True)
+    return normalizar_unidades(df)
@@ -0,0 +1,333 @@
+"""
+Motor de dados compartilhado pelas páginas do painel.
+
+Um único pool de conexões e um único snapshot por processo: app.py e
+pages/Base_Telco.py (e a API, os alertas e o cache de visões) leem a mesma
+versão dos dados, e a consulta roda no máximo uma vez por DADOS_TTL
+segundos, não importa quantas sessões estejam abertas. Por isso as duas
+telas são páginas de um único servidor (python servico.py), e não dois
+`streamlit run` separados: processos diferentes não compartilham o motor.
+
+    MOTOR.configurar(st.secrets)      credenciais (secrets, depois ambiente)
+    MOTOR.obter_snapshot()            snapshot atual, recarregado se vencido
+    MOTOR.obter_snapshot(forcar=True) recarga pedida pelo usuário (no máximo
+                                      uma a cada INTERVALO_MINIMO_RECARGA s)
+
+Com DB_FETCH_SHARDS > 1 a consulta é dividida por hash de serviceid e os
+shards rodam em paralelo, um por conexão do pool (buscar_em_shards).
+
+Falhas viram ErroConfiguracao, ErroConexao (com .tipo) ou ErroConsulta;
+cada app decide como mostrá-las. Depois de uma busca que falhou, o mesmo
+erro é repetido por INTERVALO_MINIMO_RECARGA segundos sem ir ao banco.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2 import pool
+
+import consulta
+import metricas
+import planos
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+TTL_PADRAO = 300
+POOL_MIN_PADRAO = 1
+POOL_MAX_PADRAO = 5
+SHARDS_PADRAO = 1
+
+CHAVES_OBRIGATORIAS = ('DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD')
+
+
+class ErroConfiguracao(Exception):
+    def __init__(self, chave):
+        super().__init__(f"'{chave}'")
+        self.chave = chave
+
+
+class ErroConexao(Exception):
+    """tipo: 'timeout', 'inacessivel', 'autenticacao' ou 'outro'."""
+
+    def __init__(self, tipo, mensagem):
+        super().__init__(mensagem)
+        self.tipo = tipo
+
+
+class ErroConsulta(Exception):
+    pass
+
+
+def _com_arquivo(secrets):
+    """st.secrets sem secrets.toml vira None (acessá-lo mostraria st.error)."""
+    if secrets is None:
+        return None
+    carregar = getattr(secrets, 'load_if_toml_exists', None)
+    if carregar is not None and not carregar():
+        return None
+    return secrets
+
+
+def _ler(secrets, chave, padrao=None):
+    if secrets is not None and chave in secrets:
+        return secrets[chave]
+    return os.getenv(chave, padrao)
+
+
+def carregar_config(secrets=None):
+    """
+    Parâmetros do psycopg2 a partir de st.secrets e, na falta, do ambiente.
+
+    Sem valores padrão para credenciais (LGPD - Art. 46): chave ausente
+    gera ErroConfiguracao.
+    """
+    secrets = _com_arquivo(secrets)
+    valores = {}
+    for chave in CHAVES_OBRIGATORIAS:
+        valor = _ler(secrets, chave)
+        if valor is None:
+            raise ErroConfiguracao(chave)
+        valores[chave] = valor
+
+    return {
+        'host': valores['DB_HOST'],
+        'database': valores['DB_NAME'],
+        'user': valores['DB_USER'],
+        'password': valores['DB_PASSWORD'],
+        'port': _ler(secrets, 'DB_PORT', '5432'),
+        'connect_timeout': 10,
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 5,
+        'options': consulta.opcoes_conexao(_ler(secrets, 'DB_STATEMENT_TIMEOUT_MS')),
+    }
+
+
+def buscar_em_shards(conns):
+    """
+    Uma consulta por conexão, cada uma com um shard de serviceid, em paralelo.
+
+    Na primeira falha de qualquer shard (não só do primeiro da lista), os
+    demais são cancelados no servidor e a exceção sobe: nunca se publica um
+    snapshot parcial.
+    """
+    total = len(conns)
+    with ThreadPoolExecutor(max_workers=total, thread_name_prefix='shard') as executor:
+        futuros = [
+            executor.submit(consulta.buscar_shard, conn, shard, total)
+            for shard, conn in enumerate(conns)
+        ]
+        concluidos, _ = wait(futuros, return_when=FIRST_EXCEPTION)
+        falha = next((f for f in futuros if f in concluidos and f.exception() is not None), None)
+        if falha is not None:
+            for conn in conns:
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+            raise falha.exception()
+
+        partes = [futuro.result() for futuro in futuros]
+
+    return consulta.juntar_shards(partes)
+
+
+def classificar_erro_conexao(erro):
+    mensagem = str(erro).lower()
+    if "timeout" in mensagem or "timed out" in mensagem:
+        return 'timeout'
+    if "could not connect" in mensagem or "connection refused" in mensagem:
+        return 'inacessivel'
+    if "authentication failed" in mensagem or "password" in mensagem:
+        return 'autenticacao'
+    return 'outro'
+
+
+class Motor:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.shards = SHARDS_PADRAO
+        self._config = None
+        self._pool = None
+        self._snapshot = None
+        self._falha = None
+        self._lock = threading.Lock()
+        self._lock_busca = threading.Lock()
+
+    def configurar(self, secrets=None):
+        """Lê a configuração uma vez; chamadas seguintes não mudam nada."""
+        with self._lock:
+            if self._config is not None:
+                return
+            # .env vale para qualquer página que suba o motor primeiro
+            load_dotenv()
+            secrets = _com_arquivo(secrets)
+            config = carregar_config(secrets)
+            if self.ttl is None:
+                self.ttl = int(_ler(secrets, 'DADOS_TTL', TTL_PADRAO))
+            self._tamanho_pool = (
+                int(_ler(secrets, 'DB_POOL_MIN', POOL_MIN_PADRAO)),
+                int(_ler(secrets, 'DB_POOL_MAX', POOL_MAX_PADRAO)),
+            )
+            self.shards = self._limitar_shards(int(_ler(secrets, 'DB_FETCH_SHARDS', SHARDS_PADRAO)))
+            self._config = config
+
+        # Clientes sem sessão (API) recarregam pelo mesmo caminho das sessões
+        snapshot.STORE.registrar_carregador(self._obter, ttl=self.ttl)
+
+    def _limitar_shards(self, shards):
+        # Uma conexão do pool fica livre para a captura de planos
+        maximo = max(1, self._tamanho_pool[1] - 1)
+        if shards > maximo:
+            logger.warning("DB_FETCH_SHARDS=%d maior que o pool permite; usando %d", shards, maximo)
+        return max(1, min(shards, maximo))
+
+    def pool(self):
+        """Pool do processo, criado na primeira chamada (e de novo após falha)."""
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            if self._config is None:
+                raise ErroConfiguracao('DB_HOST')
+
+            try:
+                # ThreadedConnectionPool: as sessões rodam em threads diferentes
+                connection_pool = pool.ThreadedConnectionPool(*self._tamanho_pool, **self._config)
+            except Exception as e:
+                tipo = classificar_erro_conexao(e) if isinstance(e, psycopg2.OperationalError) else 'outro'
+                metricas.registrar_erro_conexao(tipo)
+                raise ErroConexao(tipo, str(e)) from e
+
+            metricas.monitorar_pool(connection_pool)
+            self._pool = connection_pool
+            return connection_pool
+
+    def _conexoes(self, connection_pool, quantidade):
+        conns = []
+        inicio = time.perf_counter()
+        try:
+            for _ in range(quantidade):
+                conns.append(connection_pool.getconn())
+        except Exception as e:
+            self._devolver(connection_pool, conns)
+            if isinstance(e, pool.PoolError):
+                tipo, motivo = 'outro', 'pool_esgotado'
+            else:
+                tipo = classificar_erro_conexao(e) if isinstance(e, psycopg2.OperationalError) else 'outro'
+                motivo = tipo
+            metricas.registrar_erro_conexao(motivo)
+            raise ErroConexao(tipo, str(e)) from e
+
+        metricas.registrar_getconn(time.perf_counter() - inicio)
+        return conns
+
+    def _devolver(self, connection_pool, conns):
+        for conn in conns:
+            try:
+                connection_pool.putconn(conn)
+            except Exception:
+                pass
+
+    def buscar(self):
+        """Executa a consulta (serial ou em shards), publica o snapshot e devolve-o."""
+        connection_pool = self.pool()
+        conns = self._conexoes(connection_pool, self.shards)
+
+        inicio = time.perf_counter()
+        try:
+            if len(conns) == 1:
+                df = consulta.buscar_ramais(conns[0])
+            else:
+                df = buscar_em_shards(conns)
+        except Exception as e:
+            metricas.registrar_consulta(time.perf_counter() - inicio, erro=True)
+            raise ErroConsulta(str(e)) from e
+        finally:
+            self._devolver(connection_pool, conns)
+
+        metricas.registrar_consulta(time.perf_counter() - inicio, df)
+        self._snapshot = snapshot.STORE.publicar(df)
+        planos.amostrar(connection_pool, 'intercement', consulta.QUERY_INTERCEMENT)
+        return self._snapshot
+
+    def _fresco(self, snap):
+        return snap is not None and snap.idade < self.ttl
+
+    def _recente(self, snap):
+        # Recarga forçada logo após outra não vai ao banco (qualquer visitante
+        # pode clicar "Atualizar" repetidas vezes)
+        return snap is not None and snap.idade < snapshot.INTERVALO_MINIMO_RECARGA
+
+    def _obter(self, forcar=False):
+        pedido_em = time.time()
+        atual = self._snapshot
+        if self._fresco(atual) and (not forcar or self._recente(atual)):
+            return atual
+        self._repetir_falha()
+
+        # Uma consulta por vez: quem esperou recebe o snapshot (ou a falha)
+        # da consulta que a outra sessão acabou de fazer em vez de consultar de novo
+        with self._lock_busca:
+            atual = self._snapshot
+            if atual is not None and atual.carregado_em >= pedido_em:
+                return atual
+            if self._fresco(atual) and (not forcar or self._recente(atual)):
+                return atual
+            self._repetir_falha()
+
+            try:
+                novo = self.buscar()
+            except (ErroConexao, ErroConsulta) as e:
+                self._falha = (time.time(), e)
+                raise
+            self._falha = None
+            return novo
+
+    def _falha_recente(self):
+        """Erro da última busca, se falhou há menos de INTERVALO_MINIMO_RECARGA."""
+        falha = self._falha
+        if falha is not None and time.time() - falha[0] < snapshot.INTERVALO_MINIMO_RECARGA:
+            return falha[1]
+        return None
+
+    def _repetir_falha(self):
+        # Banco fora do ar: cada rerun de cada sessão esperaria o connect_timeout
+        # de novo; até passar o intervalo, todos recebem a mesma falha
+        erro = self._falha_recente()
+        if erro is None:
+            return
+        if isinstance(erro, ErroConexao):
+            raise ErroConexao(erro.tipo, str(erro))
+        raise ErroConsulta(str(erro))
+
+    def vencido(self):
+        """True se a próxima obter_snapshot() vai consultar o banco."""
+        return not self._fresco(self._snapshot) and self._falha_recente() is None
+
+    def obter_snapshot(self, forcar=False):
+        metricas.registrar_chamada_cache()
+        return self._obter(forcar)
+
+    def ultimo(self):
+        """Último snapshot publicado, mesmo vencido (para exibir quando a recarga falha)."""
+        return snapshot.STORE.atual()
+
+    def invalidar(self):
+        """A próxima obter_snapshot() consulta o banco."""
+        self._snapshot = None
+        self._falha = None
+
+
+MOTOR = Motor()
+
+
+def iniciar(secrets=None):
+    MOTOR.configurar(secrets)
+    return MOTOR
@@ -0,0 +1,292 @@
+"""
+Métricas de desempenho expostas em formato texto do Prometheus.
+
+A camada de dados atualiza os contadores deste módulo (estado do processo,
+compartilhado entre todas as sessões). O exportador apenas lê esses valores,
+então um scrape nunca dispara consulta ao banco.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler
+
+import servidor
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+DESCRICOES = {
+    'ramais_query_duration_seconds': ('histogram', 'Duração das consultas ao PostgreSQL'),
+    'ramais_query_errors_total': ('counter', 'Consultas que terminaram em erro'),
+    'ramais_snapshot_rows': ('gauge', 'Linhas no snapshot atual de ramais'),
+    'ramais_snapshot_timestamp_seconds': ('gauge', 'Momento (epoch) em que o snapshot foi carregado'),
+    'ramais_snapshot_age_seconds': ('gauge', 'Idade do snapshot atual'),
+    'ramais_registration_ratio': ('gauge', 'Taxa de registro (0-1) por unidade'),
+    'ramais_cache_requests_total': ('counter', 'Pedidos de snapshot ao motor de dados'),
+    'ramais_cache_misses_total': ('counter', 'Pedidos de snapshot que executaram a consulta'),
+    'ramais_cache_hit_ratio': ('gauge', 'Proporção de chamadas atendidas pelo cache'),
+    'ramais_pool_getconn_seconds': ('histogram', 'Duração do getconn(), incluindo abrir conexão nova (o pool não enfileira)'),
+    'ramais_db_connection_errors_total': ('counter', 'Falhas ao criar o pool ou obter conexão, por motivo'),
+    'ramais_pool_connections_in_use': ('gauge', 'Conexões do pool em uso'),
+    'ramais_pool_connections_in_use_peak': ('gauge', 'Maior número de conexões em uso já observado'),
+    'ramais_pool_connections_idle': ('gauge', 'Conexões abertas e ociosas no pool'),
+    'ramais_pool_connections_max': ('gauge', 'Limite de conexões do pool'),
+    'ramais_pool_utilization_ratio': ('gauge', 'Conexões em uso / limite do pool'),
+    'ramais_active_sessions': ('gauge', 'Sessões Streamlit ativas no processo'),
+    'ramais_alertas_total': ('counter', 'Notificações de alerta emitidas'),
+    'ramais_plan_execution_seconds': ('gauge', 'Tempo de execução na última captura de plano'),
+    'ramais_plan_buffers': ('gauge', 'Buffers (lidos + cache) na última captura de plano'),
+    'ramais_plan_regression': ('gauge', '1 se a última captura de plano regrediu em relação à base'),
+    'ramais_view_cache_hits_total': ('counter', 'Visões filtradas servidas pelo cache compartilhado'),
+    'ramais_view_cache_misses_total': ('counter', 'Visões filtradas calculadas'),
+    'ramais_view_cache_entries': ('gauge', 'Visões no cache compartilhado'),
+    'ramais_view_cache_bytes': ('gauge', 'Memória das visões em cache'),
+    'ramais_view_cache_csv_entries': ('gauge', 'CSVs de download em cache'),
+    'ramais_view_cache_csv_bytes': ('gauge', 'Memória dos CSVs em cache'),
+}
+
+
+def _chave(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _formatar_labels(chave):
+    if not chave:
+        return ""
+    partes = []
+    for nome, valor in chave:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nome}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _formatar_valor(valor):
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor))
+
+
+class Registro:
+    """Contadores, gauges e histogramas protegidos por um único lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = {}
+        self._histogramas = {}
+        self._coletores = []
+
+    def inc(self, nome, valor=1, **labels):
+        with self._lock:
+            familia = self._valores.setdefault(nome, {})
+            chave = _chave(labels)
+            familia[chave] = familia.get(chave, 0) + valor
+
+    def set(self, nome, valor, **labels):
+        with self._lock:
+            self._valores.setdefault(nome, {})[_chave(labels)] = valor
+
+    def substituir(self, nome, valores_por_label):
+        """Troca a família inteira (ex.: taxa por unidade, que some quando a unidade some)."""
+        with self._lock:
+            self._valores[nome] = {_chave(l): v for l, v in valores_por_label}
+
+    def observar(self, nome, valor, **labels):
+        with self._lock:
+            familia = self._histogramas.setdefault(nome, {})
+            chave = _chave(labels)
+            contagens, soma, total = familia.get(chave, ([0] * len(BUCKETS_SEGUNDOS), 0.0, 0))
+            indice = bisect_left(BUCKETS_SEGUNDOS, valor)
+            if indice < len(contagens):
+                contagens = contagens[:]
+                contagens[indice] += 1
+            familia[chave] = (contagens, soma + valor, total + 1)
+
+    def valor(self, nome, **labels):
+        with self._lock:
+            return self._valores.get(nome, {}).get(_chave(labels), 0)
+
+    def histograma(self, nome, **labels):
+        """(soma, quantidade) observadas em um histograma."""
+        with self._lock:
+            _, soma, total = self._histogramas.get(nome, {}).get(_chave(labels), (None, 0.0, 0))
+            return soma, total
+
+    def registrar_coletor(self, coletor):
+        """Coletor: callable chamado no scrape que devolve [(nome, labels, valor)]."""
+        with self._lock:
+            self._coletores.append(coletor)
+
+    def exportar(self):
+        with self._lock:
+            valores = {n: dict(f) for n, f in self._valores.items()}
+            histogramas = {n: dict(f) for n, f in self._histogramas.items()}
+            coletores = list(self._coletores)
+
+        for coletor in coletores:
+            try:
+                for nome, labels, valor in coletor():
+                    valores.setdefault(nome, {})[_chave(labels)] = valor
+            except Exception:
+                continue
+
+        linhas = []
+        for nome in sorted(set(valores) | set(histogramas)):
+            tipo, ajuda = DESCRICOES.get(nome, ('untyped', nome))
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+            for chave, valor in sorted(valores.get(nome, {}).items()):
+                linhas.append(f"{nome}{_formatar_labels(chave)} {_formatar_valor(valor)}")
+
+            for chave, (contagens, soma, total) in sorted(histogramas.get(nome, {}).items()):
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS_SEGUNDOS, contagens):
+                    acumulado += contagem
+                    labels = chave + (('le', limite),)
+                    linhas.append(f"{nome}_bucket{_formatar_labels(labels)} {acumulado}")
+                linhas.append(f"{nome}_bucket{_formatar_labels(chave + (('le', '+Inf'),))} {total}")
+                linhas.append(f"{nome}_sum{_formatar_labels(chave)} {_formatar_valor(soma)}")
+                linhas.append(f"{nome}_count{_formatar_labels(chave)} {total}")
+
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = Registro()
+
+# ============================================================================
+# FUNÇÕES USADAS PELA CAMADA DE DADOS
+# ============================================================================
+
+def registrar_chamada_cache():
+    """Todo pedido de snapshot ao motor de dados (acerto ou não)."""
+    REGISTRO.inc('ramais_cache_requests_total')
+
+
+def registrar_consulta(duracao, df=None, erro=False):
+    """Chamado apenas quando a consulta realmente executa (cache miss)."""
+    REGISTRO.inc('ramais_cache_misses_total')
+    REGISTRO.observar('ramais_query_duration_seconds', duracao, consulta='intercement')
+
+    if erro:
+        REGISTRO.inc('ramais_query_errors_total', consulta='intercement')
+        return
+
+    REGISTRO.set('ramais_snapshot_rows', len(df))
+    REGISTRO.set('ramais_snapshot_timestamp_seconds', time.time())
+
+    if df.empty:
+        REGISTRO.substituir('ramais_registration_ratio', [])
+        return
+
+    taxas = (df['status'] == 'Registrado').groupby(df['boname']).mean()
+    REGISTRO.substituir(
+        'ramais_registration_ratio',
+        [({'unidade': unidade}, float(taxa)) for unidade, taxa in taxas.items()]
+    )
+
+
+def registrar_getconn(duracao):
+    global _pico_em_uso
+    REGISTRO.observar('ramais_pool_getconn_seconds', duracao)
+    # O pico é medido logo após cada getconn; um scrape isolado o perderia
+    connection_pool = _pool_monitorado
+    if connection_pool is not None:
+        _pico_em_uso = max(_pico_em_uso, len(connection_pool._used))
+
+
+def zerar_pico_pool():
+    global _pico_em_uso
+    _pico_em_uso = 0
+
+
+def pico_pool():
+    return _pico_em_uso
+
+
+def registrar_erro_conexao(motivo):
+    """Falha antes da consulta (sem conexão); não conta como consulta nem cache miss."""
+    REGISTRO.inc('ramais_db_connection_errors_total', motivo=motivo)
+
+
+def monitorar_pool(connection_pool):
+    """
+    Passa a publicar a utilização deste pool a cada scrape.
+
+    Se o pool for recriado (falha na criação anterior), só o mais recente conta.
+    """
+    global _pool_monitorado
+    _pool_monitorado = connection_pool
+
+
+_pool_monitorado = None
+_pico_em_uso = 0
+
+
+def _coletor_pool():
+    connection_pool = _pool_monitorado
+    if connection_pool is None:
+        return []
+
+    em_uso = len(connection_pool._used)
+    maximo = connection_pool.maxconn
+    return [
+        ('ramais_pool_connections_in_use', {}, em_uso),
+        ('ramais_pool_connections_in_use_peak', {}, max(_pico_em_uso, em_uso)),
+        ('ramais_pool_connections_idle', {}, len(connection_pool._pool)),
+        ('ramais_pool_connections_max', {}, maximo),
+        ('ramais_pool_utilization_ratio', {}, em_uso / maximo if maximo else 0),
+    ]
+
+
+def _coletor_derivado():
+    resultado = []
+
+    carregado_em = REGISTRO.valor('ramais_snapshot_timestamp_seconds')
+    if carregado_em:
+        resultado.append(('ramais_snapshot_age_seconds', {}, time.time() - carregado_em))
+
+    chamadas = REGISTRO.valor('ramais_cache_requests_total')
+    if chamadas:
+        misses = REGISTRO.valor('ramais_cache_misses_total')
+        resultado.append(('ramais_cache_hit_ratio', {}, max(0.0, 1 - misses / chamadas)))
+
+    try:
+        from streamlit.runtime import Runtime
+        if Runtime.exists():
+            sessoes = Runtime.instance()._session_mgr.num_active_sessions()
+            resultado.append(('ramais_active_sessions', {}, sessoes))
+    except Exception:
+        pass
+
+    return resultado
+
+
+REGISTRO.registrar_coletor(_coletor_pool)
+REGISTRO.registrar_coletor(_coletor_derivado)
+
+# ============================================================================
+# EXPORTADOR HTTP
+# ============================================================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        corpo = REGISTRO.exportar().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_exportador(porta=None):
+    """Sobe o endpoint /metrics (idempotente dentro do processo)."""
+    porta = porta or int(os.getenv('METRICS_PORT', '9108'))
+    return servidor.iniciar_em_thread('metricas', _MetricsHandler, porta)
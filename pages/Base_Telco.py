@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-from psycopg2 import pool
 from datetime import datetime
-import os
 from dotenv import load_dotenv
 
+import dados
+import painel
+import visoes
+
 load_dotenv()
 
 # ============================================================================
@@ -19,20 +20,13 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-COLORS = {
-    'primary': '#1e3a5f',
-    'secondary': '#5dade2',
-    'accent': '#3498db',
-    'success': '#4CAF50',
-    'danger': '#E57373'
-}
+COLORS = painel.COLORS
 
 # ============================================================================
 # CSS
 # ============================================================================
 
-def aplicar_css():
-    st.markdown(f"""
+CSS = f"""
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800;900&display=swap');
 
@@ -84,8 +78,23 @@ def aplicar_css():
         letter-spacing: 1px;
         font-weight: 700;
     }}
+
+    /* Os 4 cards em um único bloco HTML (um elemento por rerun em vez de 8) */
+    .metric-grid {{
+        display: grid;
+        grid-template-columns: repeat(4, minmax(0, 1fr));
+        gap: 1rem;
+    }}
+
+    @media (max-width: 640px) {{
+        .metric-grid {{ grid-template-columns: 1fr; }}
+    }}
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def aplicar_css():
+    """CSS montado uma vez no import (mesmo texto a cada rerun)"""
+    st.markdown(CSS, unsafe_allow_html=True)
 
 # ============================================================================
 # SPINNER PREMIUM
@@ -118,87 +127,39 @@ def show_loading():
     </style>
     """
 
-# ============================================================================
-# FUNÇÃO PARA NORMALIZAR BONAME
-# ============================================================================
-
-def normalizar_boname(nome):
-    """Substitui _ por espaço"""
-    if pd.isna(nome):
-        return ""
-    return str(nome).replace('_', ' ')
-
 # ============================================================================
 # BANCO DE DADOS
 # ============================================================================
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', '10.211.216.242'),
-    'database': os.getenv('DB_NAME', 'basedb'),
-    'user': os.getenv('DB_USER', 'base'),
-    'password': os.getenv('DB_PASSWORD', 'base2015'),
-    'port': os.getenv('DB_PORT', '5432'),
-}
-
-# Query: Garantir ramais únicos (1 por serviceid)
-QUERY_INTERCEMENT = """
-WITH latest_records AS (
-    SELECT DISTINCT ON (st.serviceid)
-        st.serviceid,
-        sl.boname,
-        sl.bglinename,
-        st.contactregstate,
-        st.lastsync
-    FROM osvsubscriberstatus st
-    INNER JOIN osvsubscriberlist sl ON st.subscriberid = sl.id
-    WHERE sl.bgname ILIKE '%intercement%'
-        AND st.lastsync::timestamp >= NOW() - INTERVAL '24 hours'
-    ORDER BY st.serviceid, st.lastsync::timestamp DESC
-)
-SELECT 
-    serviceid,
-    boname,
-    bglinename,
-    CASE 
-        WHEN contactregstate = 1 THEN 'Registrado'
-        ELSE 'Não Registrado'
-    END as status,
-    lastsync::timestamp as ultima_sincronizacao
-FROM latest_records
-ORDER BY boname, serviceid
-"""
+# Motor de dados do processo (pool único e snapshot compartilhado com
+# app.py) e demais serviços: painel.iniciar_servicos
+try:
+    motor = painel.iniciar_servicos(st.secrets)
+except dados.ErroConfiguracao as e:
+    st.error(f"Configuração ausente: {e} (veja env.example)")
+    st.stop()
+
+cache_visoes = visoes.iniciar()
 
 # ============================================================================
 # FUNÇÕES DE DADOS
 # ============================================================================
 
-@st.cache_resource
-def get_connection_pool():
+def carregar_snapshot(forcar=False):
     try:
-        return psycopg2.pool.SimpleConnectionPool(1, 5, **DB_CONFIG)
-    except Exception as e:
+        return motor.obter_snapshot(forcar=forcar)
+    except dados.ErroConexao as e:
         st.error(f"Erro ao conectar: {e}")
-        return None
-
-@st.cache_data(ttl=300)
-def get_ramais_intercement():
-    pool = get_connection_pool()
-    if not pool:
-        return pd.DataFrame()
-    conn = pool.getconn()
-    try:
-        df = pd.read_sql_query(QUERY_INTERCEMENT, conn)
+    except dados.ErroConsulta as e:
+        st.error(f"Erro ao buscar dados: {e}")
 
-        # Normalizar boname (substituir _ por espaço)
-        if not df.empty and 'boname' in df.columns:
-            df['boname'] = df['boname'].apply(normalizar_boname)
+    # Recarga falhou: segue com o último snapshot publicado, se houver
+    snap = motor.ultimo()
+    if snap is not None:
+        st.warning(f"⚠️ Exibindo os últimos dados carregados "
+                   f"({datetime.fromtimestamp(snap.carregado_em):%d/%m/%Y %H:%M:%S}).")
+    return snap
 
-        return df
-    except Exception as e:
-        st.error(f"Erro ao buscar dados: {e}")
-        return pd.DataFrame()
-    finally:
-        pool.putconn(conn)
 
 # ============================================================================
 # APLICAR CSS
@@ -227,19 +188,21 @@ st.markdown("""
 
 col_btn, col_space = st.columns([1, 4])
 with col_btn:
-    if st.button("🔄 Atualizar Dados", type="primary", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
+    atualizar = st.button("🔄 Atualizar Dados", type="primary", use_container_width=True)
 
 # ============================================================================
 # LOADING
 # ============================================================================
 
 loading_placeholder = st.empty()
-loading_placeholder.markdown(show_loading(), unsafe_allow_html=True)
+
+# Só quando o motor vai consultar o banco; com snapshot válido nada pisca
+if atualizar or motor.vencido():
+    loading_placeholder.markdown(show_loading(), unsafe_allow_html=True)
 
 try:
-    df_ramais = get_ramais_intercement()
+    snap = carregar_snapshot(forcar=atualizar)
+    df_ramais = snap.df if snap is not None else pd.DataFrame()
     loading_placeholder.empty()
 except Exception as e:
     loading_placeholder.empty()
@@ -251,32 +214,7 @@ except Exception as e:
 # ============================================================================
 
 if not df_ramais.empty:
-    # Calcular totais
-    total = len(df_ramais)
-    registrados = len(df_ramais[df_ramais['status'] == 'Registrado'])
-    nao_registrados = len(df_ramais[df_ramais['status'] == 'Não Registrado'])
-    taxa = round((registrados / total * 100), 2) if total > 0 else 0
-
-    # Exibir cards
-    cols = st.columns(4)
-
-    cards = [
-        ("📊", "Total de Ramais", total, COLORS['primary']),
-        ("✅", "Registrados", registrados, COLORS['success']),
-        ("❌", "Não Registrados", nao_registrados, COLORS['danger']),
-        ("📈", "Taxa de Registro", f"{taxa}%", COLORS['accent'])
-    ]
-
-    for i, (icon, label, value, cor) in enumerate(cards):
-        with cols[i]:
-            valor_formatado = f"{value:,}".replace(',', '.') if isinstance(value, int) else value
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-icon" style="color: {cor}">{icon}</div>
-                <div class="metric-value" style="color: {cor}">{valor_formatado}</div>
-                <div class="metric-label">{label}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    st.markdown(painel.html_cards(snap.versao, snap.df), unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -291,7 +229,7 @@ if not df_ramais.empty:
     col_unidade, col_status, col_search = st.columns([2, 1, 2])
 
     with col_unidade:
-        unidades_disponiveis = ['Todas'] + sorted(df_ramais['boname'].dropna().unique().tolist())
+        unidades_disponiveis = ['Todas'] + snap.unidades['boname'].tolist()
         unidade_filter = st.selectbox(
             "🏢 Filtrar por Unidade",
             options=unidades_disponiveis,
@@ -314,28 +252,11 @@ if not df_ramais.empty:
         )
 
     # Aplicar filtros
-    df_filtered = df_ramais.copy()
-
-    if unidade_filter != 'Todas':
-        df_filtered = df_filtered[df_filtered['boname'] == unidade_filter]
-
-    if status_filter != 'Todos':
-        df_filtered = df_filtered[df_filtered['status'] == status_filter]
-
-    if search_term:
-        df_filtered = df_filtered[
-            df_filtered['bglinename'].astype(str).str.contains(search_term, case=False, na=False) |
-            df_filtered['serviceid'].astype(str).str.contains(search_term, case=False, na=False)
-        ]
-
-    # Preparar para exibição
-    df_display = df_filtered.copy()
-    df_display = df_display[['boname', 'bglinename', 'serviceid', 'status']]
-    df_display.columns = ['Unidade', 'Usuário', 'Ramal', 'Status']
+    visao = cache_visoes.obter(snap, unidade_filter, status_filter, search_term)
 
     # Exibir tabela
     st.dataframe(
-        df_display,
+        visao.exibicao,
         use_container_width=True,
         hide_index=True,
         height=550,
@@ -348,20 +269,14 @@ if not df_ramais.empty:
     )
 
     # Informações da filtragem
-    st.caption(f"📊 Exibindo {len(df_filtered):,} de {len(df_ramais):,} ramais".replace(',', '.'))
+    st.caption(f"📊 Exibindo {visao.linhas:,} de {len(snap.df):,} ramais".replace(',', '.'))
 
     # Download
     st.markdown("##")
     col_download, col_space = st.columns([1, 3])
     with col_download:
-        csv = df_filtered.to_csv(index=False, encoding='utf-8-sig')
-        st.download_button(
-            "📥 Baixar CSV Completo",
-            csv,
-            f"intercement_ramais_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            "text/csv",
-            use_container_width=True
-        )
+        painel.botao_csv(cache_visoes, snap, unidade_filter, status_filter, search_term,
+                         "📥 Baixar CSV Completo")
 
 else:
     st.warning("⚠️ Nenhum ramal encontrado para Intercement nas últimas 24 horas")
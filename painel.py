@@ -0,0 +1,104 @@
+"""
+Partes comuns às páginas do painel (app.py e pages/Base_Telco.py).
+
+    iniciar_servicos(st.secrets)   sobe tudo o que é do processo (também usado por servico.py)
+    html_cards(versao, df)         HTML dos cards de métricas
+    botao_csv(...)                 "Preparar CSV" e, depois do clique, o download
+"""
+
+import threading
+from datetime import datetime
+
+import streamlit as st
+
+import alertas
+import api
+import dados
+import metricas
+import planos
+import snapshot
+import visoes
+
+COLORS = {
+    'primary': '#1e3a5f',
+    'secondary': '#5dade2',
+    'accent': '#3498db',
+    'success': '#4CAF50',
+    'danger': '#E57373'
+}
+
+# ============================================================================
+# SERVIÇOS DO PROCESSO
+# ============================================================================
+
+_lock_inicio = threading.Lock()
+_iniciados = False
+
+
+def iniciar_servicos(secrets=None):
+    """
+    Sobe uma vez por processo /metrics, cache de visões, captura de planos,
+    motor de dados, API e alertas, e devolve o motor.
+
+    Cache de visões e captura de planos vêm antes do motor para que a
+    primeira busca (de uma página, da API ou dos alertas) já os encontre.
+    ErroConfiguracao do banco sobe para quem chamou a cada chamada; os
+    demais serviços continuam de pé.
+    """
+    global _iniciados
+    with _lock_inicio:
+        if not _iniciados:
+            metricas.iniciar_exportador()
+            visoes.iniciar()
+            planos.iniciar()
+            api.iniciar_api()
+            alertas.iniciar()
+            _iniciados = True
+    return dados.iniciar(secrets)
+
+# ============================================================================
+# CARDS E DOWNLOAD
+# ============================================================================
+
+@st.cache_resource(max_entries=2)
+def html_cards(versao, _df):
+    """HTML dos cards, montado uma vez por versão do snapshot"""
+    total, registrados, nao_registrados, taxa = snapshot.calcular_totais(_df)
+
+    cards = [
+        ("📊", "Total de Ramais", total, COLORS['primary']),
+        ("✅", "Registrados", registrados, COLORS['success']),
+        ("❌", "Não Registrados", nao_registrados, COLORS['danger']),
+        ("📈", "Taxa de Registro", f"{taxa}%", COLORS['accent'])
+    ]
+
+    blocos = []
+    for icon, label, value, cor in cards:
+        valor_formatado = f"{value:,}".replace(',', '.') if isinstance(value, int) else value
+        blocos.append(
+            f'<div class="metric-card">'
+            f'<div class="metric-icon" style="color: {cor}">{icon}</div>'
+            f'<div class="metric-value" style="color: {cor}">{valor_formatado}</div>'
+            f'<div class="metric-label">{label}</div>'
+            f'</div>'
+        )
+    return '<div class="metric-grid">' + ''.join(blocos) + '</div>'
+
+
+def botao_csv(cache_visoes, snap, unidade, status, busca, rotulo, use_container_width=True):
+    """CSV gerado só quando pedido (e guardado no cache para as outras sessões)"""
+    chave_csv = visoes.chave(snap, unidade, status, busca)
+    csv_pedido = st.session_state.get('csv_pedido') == chave_csv
+    espaco_csv = st.empty()
+    if not csv_pedido and espaco_csv.button("📥 Preparar CSV", use_container_width=use_container_width):
+        st.session_state['csv_pedido'] = chave_csv
+        csv_pedido = True
+
+    if csv_pedido:
+        espaco_csv.download_button(
+            rotulo,
+            cache_visoes.csv(snap, unidade, status, busca),
+            f"intercement_ramais_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "text/csv",
+            use_container_width=use_container_width
+        )
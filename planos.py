@@ -0,0 +1,213 @@
+"""
+Captura amostrada de planos de execução e alerta de regressão.
+
+De tempos em tempos (no máximo uma vez por PLANOS_INTERVALO segundos por
+consulta) roda EXPLAIN (ANALYZE, BUFFERS) da consulta em uma thread à parte,
+guarda a impressão digital do plano (formato da árvore: nós, tabelas,
+índices) com tempos e buffers, e compara com a linha de base. Mudança de
+formato ou buffers/tempo acima do limiar são registrados em log e em
+metricas.py.
+
+A linha de base fica em PLANOS_BASELINE (JSON); na primeira captura de cada
+consulta, se não houver base, ela passa a ser a base.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from psycopg2 import pool
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_PADRAO = 1800
+LIMIAR_PADRAO = 0.5
+
+# Atributos que definem o formato do plano (sem custos/linhas estimadas)
+ATRIBUTOS_FORMATO = ('Node Type', 'Relation Name', 'Index Name', 'Join Type', 'Strategy', 'Parent Relationship')
+
+
+def impressao_digital(plano):
+    """Hash estável do formato da árvore do plano."""
+    def formato(no):
+        return [
+            [no.get(atributo) for atributo in ATRIBUTOS_FORMATO],
+            [formato(filho) for filho in no.get('Plans', [])]
+        ]
+
+    serializado = json.dumps(formato(plano), separators=(',', ':'))
+    return hashlib.sha1(serializado.encode('utf-8')).hexdigest()[:16]
+
+
+def resumir_plano(explain):
+    """Extrai o que importa do resultado de EXPLAIN (FORMAT JSON)."""
+    resultado = explain[0]
+    plano = resultado['Plan']
+    return {
+        'impressao_digital': impressao_digital(plano),
+        'no_raiz': plano.get('Node Type'),
+        'execucao_ms': resultado.get('Execution Time', 0.0),
+        'planejamento_ms': resultado.get('Planning Time', 0.0),
+        'buffers_lidos': plano.get('Shared Read Blocks', 0),
+        'buffers_cache': plano.get('Shared Hit Blocks', 0),
+        'linhas': plano.get('Actual Rows', 0),
+    }
+
+
+def comparar(captura, base, limiar):
+    """Lista de motivos de regressão (vazia se está tudo bem)."""
+    motivos = []
+    if captura['impressao_digital'] != base['impressao_digital']:
+        motivos.append(
+            f"formato do plano mudou ({base['impressao_digital']} -> {captura['impressao_digital']})"
+        )
+
+    buffers = captura['buffers_lidos'] + captura['buffers_cache']
+    buffers_base = base['buffers_lidos'] + base['buffers_cache']
+    if buffers_base and buffers > buffers_base * (1 + limiar):
+        motivos.append(f"buffers {buffers_base} -> {buffers}")
+
+    if base['execucao_ms'] and captura['execucao_ms'] > base['execucao_ms'] * (1 + limiar):
+        motivos.append(f"execução {base['execucao_ms']:.0f} ms -> {captura['execucao_ms']:.0f} ms")
+
+    return motivos
+
+
+class CapturaPlanos:
+    def __init__(self, intervalo=None, limiar=None, caminho_base=None):
+        self.intervalo = intervalo if intervalo is not None else int(
+            os.getenv('PLANOS_INTERVALO', INTERVALO_PADRAO))
+        self.limiar = limiar if limiar is not None else float(
+            os.getenv('PLANOS_LIMIAR', LIMIAR_PADRAO))
+        self.caminho_base = caminho_base or os.getenv('PLANOS_BASELINE', 'planos_baseline.json')
+
+        self._lock = threading.Lock()
+        self._ultima_captura = {}
+        self._em_andamento = set()
+        self._aviso_pool = False
+        self.historico = deque(maxlen=100)
+        self.base = self._carregar_base()
+
+    def _carregar_base(self):
+        try:
+            with open(self.caminho_base, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_base(self):
+        try:
+            with open(self.caminho_base, 'w', encoding='utf-8') as arquivo:
+                json.dump(self.base, arquivo, indent=2, ensure_ascii=False)
+        except OSError as e:
+            logger.warning("Não foi possível gravar a base de planos: %s", e)
+
+    def amostrar(self, connection_pool, nome, sql):
+        """
+        Agenda uma captura se a última desta consulta já passou do intervalo.
+
+        Retorna logo; o EXPLAIN ANALYZE roda em thread própria e devolve a
+        conexão ao pool ao terminar. Por isso só aceita ThreadedConnectionPool:
+        o SimpleConnectionPool não pode ser usado por duas threads.
+        """
+        if not isinstance(connection_pool, pool.ThreadedConnectionPool):
+            if not self._aviso_pool:
+                logger.warning("Captura de planos desligada: pool %s não é thread-safe",
+                               type(connection_pool).__name__)
+                self._aviso_pool = True
+            return False
+
+        agora = time.time()
+        with self._lock:
+            if nome in self._em_andamento:
+                return False
+            if agora - self._ultima_captura.get(nome, 0) < self.intervalo:
+                return False
+            self._ultima_captura[nome] = agora
+            self._em_andamento.add(nome)
+
+        threading.Thread(
+            target=self._capturar,
+            args=(connection_pool, nome, sql),
+            name=f"plano-{nome}",
+            daemon=True
+        ).start()
+        return True
+
+    def _capturar(self, connection_pool, nome, sql):
+        conn = None
+        try:
+            conn = connection_pool.getconn()
+            with conn.cursor() as cursor:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+                explain = cursor.fetchone()[0]
+            conn.rollback()
+
+            if isinstance(explain, str):
+                explain = json.loads(explain)
+            self.registrar(nome, resumir_plano(explain))
+
+        except Exception as e:
+            logger.warning("Falha ao capturar plano de %s: %s", nome, e)
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+        finally:
+            if conn is not None:
+                try:
+                    connection_pool.putconn(conn)
+                except Exception:
+                    pass
+            with self._lock:
+                self._em_andamento.discard(nome)
+
+    def registrar(self, nome, captura):
+        captura = dict(captura, consulta=nome, momento=datetime.now().isoformat(timespec='seconds'))
+
+        base = self.base.get(nome)
+        if base is None:
+            self.base[nome] = captura
+            self._salvar_base()
+            motivos = []
+        else:
+            motivos = comparar(captura, base, self.limiar)
+
+        captura['regressao'] = motivos
+        self.historico.append(captura)
+
+        metricas.REGISTRO.set('ramais_plan_execution_seconds', captura['execucao_ms'] / 1000, consulta=nome)
+        metricas.REGISTRO.set('ramais_plan_buffers', captura['buffers_lidos'] + captura['buffers_cache'],
+                              consulta=nome)
+        metricas.REGISTRO.set('ramais_plan_regression', 1 if motivos else 0, consulta=nome)
+
+        if motivos:
+            logger.warning("Regressão no plano de %s: %s", nome, "; ".join(motivos))
+
+        return captura
+
+
+CAPTURA = None
+
+
+def iniciar():
+    """Cria a captura do processo (lê PLANOS_* do ambiente já carregado)."""
+    global CAPTURA
+    if CAPTURA is None:
+        CAPTURA = CapturaPlanos()
+    return CAPTURA
+
+
+def amostrar(connection_pool, nome, sql):
+    """Atalho usado pela camada de dados; não faz nada antes de iniciar()."""
+    if CAPTURA is None:
+        return False
+    return CAPTURA.amostrar(connection_pool, nome, sql)
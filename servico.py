@@ -0,0 +1,49 @@
+"""
+Ponto de entrada de produção: Streamlit e serviços auxiliares no mesmo processo.
+
+    python servico.py
+
+Antes do primeiro acesso ao painel já sobe, pelo mesmo
+painel.iniciar_servicos das páginas, o motor de dados, o cache de visões,
+a captura de planos, o /metrics, a API de leitura e os alertas. Assim
+ferramentas headless (NOC, Prometheus) e as regras de alerta funcionam
+logo após um restart, sem ninguém abrir a página. Opções do Streamlit
+(porta etc.) vão em .streamlit/config.toml.
+
+`streamlit run app.py` continua funcionando; nesse modo os serviços só
+sobem na primeira sessão.
+"""
+
+import logging
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+from streamlit.web import bootstrap
+
+import dados
+import painel
+
+logger = logging.getLogger(__name__)
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(RAIZ, 'app.py')
+
+
+def iniciar_servicos():
+    try:
+        painel.iniciar_servicos(st.secrets)
+    except dados.ErroConfiguracao as e:
+        # O painel mostra a mesma falha a quem abrir a página
+        logger.error("Configuração do banco ausente: %s", e)
+
+
+def main():
+    load_dotenv()
+    bootstrap.load_config_options(flag_options={})
+    iniciar_servicos()
+    bootstrap.run(SCRIPT, False, [], {})
+
+
+if __name__ == '__main__':
+    main()
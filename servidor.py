@@ -0,0 +1,45 @@
+"""
+Servidor HTTP auxiliar executado ao lado do Streamlit.
+
+Usado pelos endpoints internos (métricas, API de leitura). Cada servidor roda
+em uma thread daemon do mesmo processo, então lê o estado compartilhado da
+camada de dados sem abrir sessões Streamlit.
+"""
+
+import logging
+import threading
+from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+_servidores = {}
+_lock = threading.Lock()
+
+
+def iniciar_em_thread(nome, handler_cls, porta, host="0.0.0.0"):
+    """
+    Sobe um ThreadingHTTPServer em thread daemon (uma única vez por nome).
+
+    Retorna o servidor já em execução ou None se a porta estiver ocupada
+    (por exemplo, um segundo processo do painel no mesmo host).
+    """
+    with _lock:
+        if nome in _servidores:
+            return _servidores[nome]
+
+        try:
+            servidor = ThreadingHTTPServer((host, int(porta)), handler_cls)
+        except OSError as e:
+            logger.warning("Servidor '%s' não iniciado na porta %s: %s", nome, porta, e)
+            return None
+
+        servidor.daemon_threads = True
+        thread = threading.Thread(
+            target=servidor.serve_forever,
+            name=f"servidor-{nome}",
+            daemon=True
+        )
+        thread.start()
+        _servidores[nome] = servidor
+        logger.info("Servidor '%s' ouvindo em %s:%s", nome, host, porta)
+        return servidor
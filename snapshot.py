@@ -0,0 +1,168 @@
+"""
+Snapshot compartilhado dos ramais.
+
+Guarda o último DataFrame carregado pela camada de dados, com versão e
+agregados por unidade já calculados, para uso fora das sessões Streamlit
+(API de leitura, alertas). O DataFrame publicado é somente leitura.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STATUS_REGISTRADO = 'Registrado'
+STATUS_NAO_REGISTRADO = 'Não Registrado'
+
+# Intervalo mínimo entre tentativas de recarga disparadas fora do Streamlit
+INTERVALO_MINIMO_RECARGA = 10
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    versao: int
+    df: pd.DataFrame
+    unidades: pd.DataFrame
+    carregado_em: float
+
+    @property
+    def idade(self):
+        return time.time() - self.carregado_em
+
+
+def agregar_por_unidade(df):
+    """Total, registrados, não registrados e taxa (%) por boname."""
+    if df.empty:
+        return pd.DataFrame(columns=['boname', 'total', 'registrados', 'nao_registrados', 'taxa'])
+
+    registrado = df['status'] == STATUS_REGISTRADO
+    agregados = registrado.groupby(df['boname']).agg(['size', 'sum'])
+    agregados.columns = ['total', 'registrados']
+    agregados['nao_registrados'] = agregados['total'] - agregados['registrados']
+    agregados['taxa'] = (agregados['registrados'] / agregados['total'] * 100).round(2)
+    return agregados.reset_index()
+
+
+def calcular_totais(df):
+    """Valores dos cards: total, registrados, não registrados e taxa (%)."""
+    total = len(df)
+    registrados = int((df['status'] == STATUS_REGISTRADO).sum()) if total else 0
+    nao_registrados = int((df['status'] == STATUS_NAO_REGISTRADO).sum()) if total else 0
+    taxa = round((registrados / total * 100), 2) if total > 0 else 0
+    return total, registrados, nao_registrados, taxa
+
+
+def filtrar_ramais(df, unidade='Todas', status='Todos', busca=''):
+    """Mesma cadeia de filtros da tela: unidade, status e busca por usuário/ramal."""
+    if unidade and unidade != 'Todas':
+        df = df[df['boname'] == unidade]
+
+    if status and status != 'Todos':
+        df = df[df['status'] == status]
+
+    if busca:
+        df = df[
+            df['bglinename'].astype(str).str.contains(busca, case=False, na=False, regex=False) |
+            df['serviceid'].astype(str).str.contains(busca, case=False, na=False, regex=False)
+        ]
+
+    return df
+
+
+COLUNAS_EXIBICAO = {
+    'boname': 'Unidade',
+    'bglinename': 'Usuário',
+    'serviceid': 'Ramal',
+    'status': 'Status',
+}
+
+
+def projetar_exibicao(df):
+    """Colunas e nomes usados na tabela da tela."""
+    return df[list(COLUNAS_EXIBICAO)].rename(columns=COLUNAS_EXIBICAO)
+
+
+class SnapshotStore:
+    """Último snapshot publicado no processo, com recarga sob demanda."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_recarga = threading.Lock()
+        self._atual = None
+        self._versao = 0
+        self._carregador = None
+        self._ttl = None
+        self._ultima_tentativa = 0.0
+        self._assinantes = []
+
+    def publicar(self, df):
+        unidades = agregar_por_unidade(df)
+        with self._lock:
+            self._versao += 1
+            novo = Snapshot(
+                versao=self._versao,
+                df=df,
+                unidades=unidades,
+                carregado_em=time.time()
+            )
+            self._atual = novo
+            assinantes = list(self._assinantes)
+
+        for assinante in assinantes:
+            try:
+                assinante(novo)
+            except Exception:
+                logger.exception("Falha ao notificar assinante do snapshot")
+
+        return novo
+
+    def assinar(self, callback):
+        """callback(snapshot) é chamado uma vez a cada snapshot publicado."""
+        with self._lock:
+            self._assinantes.append(callback)
+
+    def atual(self):
+        return self._atual
+
+    @property
+    def ttl(self):
+        """TTL do carregador registrado (None antes do motor de dados subir)."""
+        return self._ttl
+
+    def registrar_carregador(self, carregador, ttl):
+        """
+        Função que recarrega os dados (dados.Motor) e publica aqui.
+
+        Permite que clientes headless obtenham dados mesmo sem sessões abertas.
+        """
+        self._carregador = carregador
+        self._ttl = ttl
+
+    def obter(self):
+        """Snapshot atual, recarregando antes se estiver vencido."""
+        atual = self._atual
+        if self._carregador is None or (atual is not None and atual.idade < self._ttl):
+            return atual
+
+        with self._lock_recarga:
+            atual = self._atual
+            if atual is not None and atual.idade < self._ttl:
+                return atual
+            if time.time() - self._ultima_tentativa < INTERVALO_MINIMO_RECARGA:
+                return atual
+
+            self._ultima_tentativa = time.time()
+            try:
+                self._carregador()
+            except Exception:
+                # Quem chamou segue com o snapshot anterior (ou None); o motivo fica no log
+                logger.warning("Falha ao recarregar o snapshot", exc_info=True)
+
+        return self._atual
+
+
+STORE = SnapshotStore()
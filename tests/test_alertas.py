@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+import alertas
+import snapshot
+
+
+def _snap(store, status):
+    return store.publicar(pd.DataFrame({
+        'serviceid': ['1000', '1001', '1002', '1003'],
+        'boname': ['Unidade A', 'Unidade A', 'Unidade B', 'Unidade B'],
+        'bglinename': ['Ana', 'Bia', 'Caio', 'Davi'],
+        'status': status,
+    }))
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000_000.0]
+    monkeypatch.setattr(alertas.time, 'time', lambda: agora[0])
+    return agora
+
+
+def _motor(regras, cooldown_minutos=30):
+    eventos = []
+    motor = alertas.MotorAlertas(regras, [eventos.append], cooldown_minutos=cooldown_minutos)
+    return motor, eventos
+
+
+REGISTRADO = snapshot.STATUS_REGISTRADO
+FORA = snapshot.STATUS_NAO_REGISTRADO
+
+
+def test_dispara_uma_vez_enquanto_ativo(relogio):
+    store = snapshot.SnapshotStore()
+    motor, eventos = _motor([{'tipo': 'ramal_critico', 'ramais': ['1000']}])
+
+    motor.avaliar(_snap(store, [FORA, REGISTRADO, REGISTRADO, REGISTRADO]))
+    relogio[0] += 60
+    motor.avaliar(_snap(store, [FORA, REGISTRADO, REGISTRADO, REGISTRADO]))
+
+    assert [(e['estado'], e['alvo']) for e in eventos] == [('disparado', '1000')]
+
+
+def test_repete_depois_do_cooldown(relogio):
+    store = snapshot.SnapshotStore()
+    motor, eventos = _motor([{'tipo': 'ramal_critico', 'ramais': ['1000']}], cooldown_minutos=10)
+
+    motor.avaliar(_snap(store, [FORA, REGISTRADO, REGISTRADO, REGISTRADO]))
+    relogio[0] += 11 * 60
+    motor.avaliar(_snap(store, [FORA, REGISTRADO, REGISTRADO, REGISTRADO]))
+
+    assert [e['estado'] for e in eventos] == ['disparado', 'disparado']
+
+
+def test_resolve_quando_a_condicao_some(relogio):
+    store = snapshot.SnapshotStore()
+    motor, eventos = _motor([{'nome': 'baixa', 'tipo': 'taxa_minima', 'limite': 80}])
+
+    motor.avaliar(_snap(store, [FORA, FORA, REGISTRADO, REGISTRADO]))
+    motor.avaliar(_snap(store, [REGISTRADO] * 4))
+
+    assert [(e['estado'], e['regra'], e['alvo']) for e in eventos] == [
+        ('disparado', 'baixa', 'Unidade A'),
+        ('resolvido', 'baixa', 'Unidade A'),
+    ]
+
+
+def test_desregistros_na_janela(relogio):
+    store = snapshot.SnapshotStore()
+    motor, eventos = _motor([{'tipo': 'desregistros', 'quantidade': 1, 'janela_minutos': 10}])
+
+    motor.avaliar(_snap(store, [REGISTRADO] * 4))
+    relogio[0] += 60
+    motor.avaliar(_snap(store, [FORA, FORA, REGISTRADO, REGISTRADO]))
+    assert [e['estado'] for e in eventos] == ['disparado']
+
+    relogio[0] += 11 * 60
+    motor.avaliar(_snap(store, [FORA, FORA, REGISTRADO, REGISTRADO]))
+    assert [e['estado'] for e in eventos] == ['disparado', 'resolvido']
+
+
+@pytest.mark.parametrize('regra', [
+    {'tipo': 'taxa_minima'},
+    {'tipo': 'desregistros', 'quantidade': 5},
+    {'tipo': 'ramal_critico'},
+    {'tipo': 'inexistente'},
+])
+def test_regra_incompleta_falha_no_carregamento(regra):
+    with pytest.raises(ValueError):
+        alertas.MotorAlertas([regra], [])
+
+
+def test_config_invalida_nao_derruba_o_painel(tmp_path, monkeypatch):
+    monkeypatch.setattr(alertas, 'MOTOR', None)
+    caminho = tmp_path / 'alertas.toml'
+    caminho.write_text('[[regras]]\ntipo = "taxa_minima"\nlimite = \n', encoding='utf-8')
+
+    assert alertas.iniciar(str(caminho)) is None
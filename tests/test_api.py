@@ -0,0 +1,75 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import api
+import snapshot
+
+
+def _df(status):
+    return pd.DataFrame({
+        'serviceid': ['1000', '1001'],
+        'boname': ['Unidade A', 'Unidade B'],
+        'bglinename': ['Ana', 'Bruno'],
+        'status': status,
+        'ultima_sincronizacao': pd.to_datetime(['2024-01-01', '2024-01-01']),
+    })
+
+
+@pytest.fixture
+def url(monkeypatch):
+    store = snapshot.SnapshotStore()
+    monkeypatch.setattr(snapshot, 'STORE', store)
+    monkeypatch.delenv('API_TOKEN', raising=False)
+    store.publicar(_df(['Registrado', 'Registrado']))
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), api._ApiHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}/api/ramais"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(url, etag=None):
+    requisicao = urllib.request.Request(url)
+    if etag:
+        requisicao.add_header('If-None-Match', etag)
+    try:
+        with urllib.request.urlopen(requisicao) as resposta:
+            return resposta.status, resposta.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get('ETag')
+
+
+def test_mesmo_snapshot_responde_304(url):
+    status, etag = _get(url)
+    assert status == 200
+
+    assert _get(url, etag) == (304, etag)
+
+
+def test_snapshot_novo_muda_etag(url):
+    _, etag = _get(url)
+    snapshot.STORE.publicar(_df(['Registrado', 'Não Registrado']))
+
+    status, novo = _get(url, etag)
+    assert status == 200
+    assert novo != etag
+
+
+def test_etag_de_outro_processo_nao_gera_304(url, monkeypatch):
+    _, etag = _get(url)
+    monkeypatch.setattr(api, 'ID_PROCESSO', 'reiniciado')
+
+    status, novo = _get(url, etag)
+    assert status == 200
+    assert novo != etag
+
+
+def test_nao_expoe_fora_do_localhost_sem_token(monkeypatch):
+    monkeypatch.delenv('API_TOKEN', raising=False)
+    assert api.iniciar_api(porta=0, host='0.0.0.0') is None
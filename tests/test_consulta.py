@@ -0,0 +1,30 @@
+import pandas as pd
+
+import consulta
+
+
+def test_consulta_de_shard_tem_o_predicado():
+    sql = consulta.QUERY_INTERCEMENT_SHARD % {'shard': 2, 'total': 4}
+
+    assert "(hashtext(st.serviceid::text) & 2147483647) % 4 = 2" in sql
+    # O predicado entra no WHERE da subconsulta, antes do DISTINCT ON ordenar
+    assert sql.index("% 4 = 2") < sql.index("ORDER BY st.serviceid")
+
+
+def test_consulta_de_shard_so_difere_pelo_predicado():
+    sql = consulta.QUERY_INTERCEMENT_SHARD % {'shard': 0, 'total': 2}
+    predicado = consulta._PREDICADO_SHARD % {'shard': 0, 'total': 2}
+
+    assert sql.replace(predicado, '') == consulta.QUERY_INTERCEMENT
+
+
+def test_juntar_shards_tem_as_linhas_de_todos_os_shards():
+    partes = [
+        pd.DataFrame({'boname': ['Unidade_B', 'Unidade_A'], 'serviceid': ['2', '3']}),
+        pd.DataFrame({'boname': ['Unidade_A'], 'serviceid': ['1']}),
+    ]
+
+    df = consulta.juntar_shards(partes)
+
+    assert df['serviceid'].tolist() == ['1', '3', '2']
+    assert df['boname'].tolist() == ['Unidade A', 'Unidade A', 'Unidade B']
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import consulta
+import dados
+
+
+class _ConexaoFalsa:
+    def __init__(self):
+        self.cancelada = threading.Event()
+
+    def cancel(self):
+        self.cancelada.set()
+
+
+def test_falha_em_um_shard_cancela_os_demais_sem_esperar(monkeypatch):
+    conns = [_ConexaoFalsa() for _ in range(3)]
+
+    def buscar_shard(conn, shard, total):
+        if shard == 2:
+            raise RuntimeError("shard 2 caiu")
+        # Os outros shards só terminam quando cancelados (ou após 5 s)
+        conn.cancelada.wait(5)
+        raise RuntimeError("cancelado")
+
+    monkeypatch.setattr(consulta, 'buscar_shard', buscar_shard)
+
+    inicio = time.perf_counter()
+    with pytest.raises(RuntimeError, match="shard 2 caiu"):
+        dados.buscar_em_shards(conns)
+
+    assert time.perf_counter() - inicio < 2
+    assert all(conn.cancelada.is_set() for conn in conns)
+
+
+def test_shards_sem_falha_sao_unidos(monkeypatch):
+    def buscar_shard(conn, shard, total):
+        return pd.DataFrame({'boname': [f'U{shard}'], 'serviceid': [str(shard)]})
+
+    monkeypatch.setattr(consulta, 'buscar_shard', buscar_shard)
+
+    df = dados.buscar_em_shards([_ConexaoFalsa(), _ConexaoFalsa()])
+    assert df['serviceid'].tolist() == ['0', '1']
+
+
+def test_falha_na_busca_e_repetida_sem_consultar_de_novo(monkeypatch):
+    motor = dados.Motor(ttl=300)
+    chamadas = []
+
+    def buscar():
+        chamadas.append(threading.current_thread().name)
+        time.sleep(0.3)
+        raise dados.ErroConexao('timeout', "banco fora do ar")
+
+    monkeypatch.setattr(motor, 'buscar', buscar)
+
+    erros = []
+
+    def sessao():
+        try:
+            motor.obter_snapshot()
+        except dados.ErroConexao as e:
+            erros.append(e.tipo)
+
+    inicio = time.perf_counter()
+    sessoes = [threading.Thread(target=sessao) for _ in range(6)]
+    for thread in sessoes:
+        thread.start()
+    for thread in sessoes:
+        thread.join()
+
+    # Quem esperou a busca que falhou recebe a mesma falha
+    assert len(chamadas) == 1
+    assert erros == ['timeout'] * 6
+    assert time.perf_counter() - inicio < 1
+
+    # Reruns seguintes, dentro do intervalo, também não vão ao banco
+    with pytest.raises(dados.ErroConexao):
+        motor.obter_snapshot()
+    assert len(chamadas) == 1
+    assert not motor.vencido()
+
+
+def test_busca_volta_a_ser_tentada_apos_o_intervalo(monkeypatch):
+    motor = dados.Motor(ttl=300)
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        raise dados.ErroConsulta("relation does not exist")
+
+    monkeypatch.setattr(motor, 'buscar', buscar)
+    monkeypatch.setattr(dados.snapshot, 'INTERVALO_MINIMO_RECARGA', 0.05)
+
+    with pytest.raises(dados.ErroConsulta):
+        motor.obter_snapshot()
+    time.sleep(0.1)
+    assert motor.vencido()
+    with pytest.raises(dados.ErroConsulta):
+        motor.obter_snapshot()
+    assert len(chamadas) == 2
+
+
+def test_recarga_forcada_respeita_o_intervalo_minimo(monkeypatch):
+    motor = dados.Motor(ttl=300)
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        motor._snapshot = dados.snapshot.SnapshotStore().publicar(pd.DataFrame())
+        return motor._snapshot
+
+    monkeypatch.setattr(motor, 'buscar', buscar)
+
+    primeiro = motor.obter_snapshot()
+    assert motor.obter_snapshot(forcar=True) is primeiro
+    assert len(chamadas) == 1
+
+    monkeypatch.setattr(dados.snapshot, 'INTERVALO_MINIMO_RECARGA', 0)
+    assert motor.obter_snapshot(forcar=True) is not primeiro
+    assert len(chamadas) == 2
@@ -0,0 +1,83 @@
+import metricas
+
+
+def _linhas(registro):
+    return registro.exportar().splitlines()
+
+
+def test_histograma_acumula_buckets_e_tem_inf_sum_e_count():
+    registro = metricas.Registro()
+    for valor in (0.003, 0.005, 0.02, 0.3, 60):
+        registro.observar('ramais_query_duration_seconds', valor)
+
+    linhas = _linhas(registro)
+
+    assert '# TYPE ramais_query_duration_seconds histogram' in linhas
+    # le é inclusivo: 0.005 cai no bucket de 0.005
+    assert 'ramais_query_duration_seconds_bucket{le="0.005"} 2' in linhas
+    assert 'ramais_query_duration_seconds_bucket{le="0.01"} 2' in linhas
+    assert 'ramais_query_duration_seconds_bucket{le="0.025"} 3' in linhas
+    assert 'ramais_query_duration_seconds_bucket{le="0.5"} 4' in linhas
+    assert 'ramais_query_duration_seconds_bucket{le="30"} 4' in linhas
+    # Acima do último limite só entra no +Inf
+    assert 'ramais_query_duration_seconds_bucket{le="+Inf"} 5' in linhas
+    assert 'ramais_query_duration_seconds_count 5' in linhas
+    soma = next(l for l in linhas if l.startswith('ramais_query_duration_seconds_sum '))
+    assert float(soma.split()[1]) == sum((0.003, 0.005, 0.02, 0.3, 60))
+
+
+def test_buckets_nunca_diminuem():
+    registro = metricas.Registro()
+    for valor in (0.001, 0.04, 0.04, 2, 7):
+        registro.observar('ramais_pool_getconn_seconds', valor)
+
+    contagens = [
+        int(l.rsplit(' ', 1)[1]) for l in _linhas(registro)
+        if l.startswith('ramais_pool_getconn_seconds_bucket')
+    ]
+    assert len(contagens) == len(metricas.BUCKETS_SEGUNDOS) + 1
+    assert contagens == sorted(contagens)
+    assert contagens[-1] == 5
+
+
+def test_histograma_com_labels_poe_le_por_ultimo():
+    registro = metricas.Registro()
+    registro.observar('ramais_query_duration_seconds', 0.2, consulta='intercement')
+
+    linhas = _linhas(registro)
+
+    assert 'ramais_query_duration_seconds_bucket{consulta="intercement",le="0.25"} 1' in linhas
+    assert 'ramais_query_duration_seconds_count{consulta="intercement"} 1' in linhas
+
+
+def test_labels_escapam_barra_aspas_e_quebra_de_linha():
+    registro = metricas.Registro()
+    registro.set('ramais_registration_ratio', 0.5, unidade='Sede "SP"\\Centro\nBloco A')
+
+    assert 'ramais_registration_ratio{unidade="Sede \\"SP\\"\\\\Centro\\nBloco A"} 0.5' in _linhas(registro)
+
+
+def test_substituir_remove_unidades_que_sumiram():
+    registro = metricas.Registro()
+    registro.substituir('ramais_registration_ratio', [({'unidade': 'A'}, 0.9), ({'unidade': 'B'}, 0.8)])
+    registro.substituir('ramais_registration_ratio', [({'unidade': 'A'}, 0.7)])
+
+    linhas = [l for l in _linhas(registro) if l.startswith('ramais_registration_ratio{')]
+    assert linhas == ['ramais_registration_ratio{unidade="A"} 0.7']
+
+
+def test_contador_e_coletor_com_falha():
+    registro = metricas.Registro()
+    registro.inc('ramais_query_errors_total')
+    registro.inc('ramais_query_errors_total')
+
+    def coletor_quebrado():
+        raise RuntimeError("pool fechado")
+
+    registro.registrar_coletor(coletor_quebrado)
+    registro.registrar_coletor(lambda: [('ramais_active_sessions', {}, 3)])
+
+    linhas = _linhas(registro)
+    assert '# TYPE ramais_query_errors_total counter' in linhas
+    assert 'ramais_query_errors_total 2.0' in linhas
+    assert 'ramais_active_sessions 3.0' in linhas
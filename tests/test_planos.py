@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from psycopg2 import pool
+
+import metricas
+import planos
+
+
+def _plano(indice='osvsubscriberstatus_serviceid_idx', custo=100.0, linhas=1000, no_interno='Index Scan'):
+    return {
+        'Node Type': 'Unique',
+        'Total Cost': custo,
+        'Plan Rows': linhas,
+        'Actual Rows': linhas,
+        'Plans': [{
+            'Node Type': 'Nested Loop',
+            'Join Type': 'Inner',
+            'Parent Relationship': 'Outer',
+            'Total Cost': custo * 0.9,
+            'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'osvsubscriberlist', 'Parent Relationship': 'Outer'},
+                {'Node Type': no_interno, 'Relation Name': 'osvsubscriberstatus', 'Index Name': indice,
+                 'Parent Relationship': 'Inner', 'Actual Rows': linhas},
+            ],
+        }],
+    }
+
+
+def _captura(execucao_ms=100.0, lidos=50, cache=50, plano=None):
+    return {
+        'impressao_digital': planos.impressao_digital(plano or _plano()),
+        'no_raiz': 'Unique',
+        'execucao_ms': execucao_ms,
+        'planejamento_ms': 1.0,
+        'buffers_lidos': lidos,
+        'buffers_cache': cache,
+        'linhas': 1000,
+    }
+
+
+def test_custos_e_linhas_nao_mudam_a_impressao_digital():
+    assert planos.impressao_digital(_plano()) == planos.impressao_digital(_plano(custo=9999.0, linhas=3))
+
+
+def test_troca_de_no_ou_de_indice_muda_a_impressao_digital():
+    base = planos.impressao_digital(_plano())
+    assert planos.impressao_digital(_plano(indice='outro_idx')) != base
+    assert planos.impressao_digital(_plano(no_interno='Bitmap Heap Scan')) != base
+
+
+def test_resumir_plano_le_tempos_e_buffers():
+    plano = dict(_plano(), **{'Shared Read Blocks': 7, 'Shared Hit Blocks': 30})
+    resumo = planos.resumir_plano([{'Plan': plano, 'Execution Time': 12.5, 'Planning Time': 0.4}])
+
+    assert resumo['impressao_digital'] == planos.impressao_digital(_plano())
+    assert (resumo['execucao_ms'], resumo['buffers_lidos'], resumo['buffers_cache']) == (12.5, 7, 30)
+
+
+@pytest.mark.parametrize('captura, esperado', [
+    (_captura(), []),
+    # No limiar (50%) ainda não é regressão
+    (_captura(execucao_ms=150.0, lidos=100, cache=50), []),
+    (_captura(lidos=200), ["buffers 100 -> 250"]),
+    (_captura(execucao_ms=151.0), ["execução 100 ms -> 151 ms"]),
+])
+def test_comparar_aplica_limiar_de_buffers_e_tempo(captura, esperado):
+    assert planos.comparar(captura, _captura(), 0.5) == esperado
+
+
+def test_comparar_aponta_mudanca_de_formato():
+    motivos = planos.comparar(_captura(plano=_plano(indice='outro_idx')), _captura(), 0.5)
+    assert len(motivos) == 1 and motivos[0].startswith("formato do plano mudou")
+
+
+def test_primeira_captura_vira_base(tmp_path):
+    caminho = tmp_path / 'base.json'
+    captura = planos.CapturaPlanos(intervalo=0, limiar=0.5, caminho_base=str(caminho))
+
+    primeira = captura.registrar('intercement', _captura())
+    assert primeira['regressao'] == []
+    assert json.loads(caminho.read_text(encoding='utf-8'))['intercement']['impressao_digital'] == \
+        primeira['impressao_digital']
+
+    segunda = captura.registrar('intercement', _captura(execucao_ms=400.0))
+    assert segunda['regressao'] == ["execução 100 ms -> 400 ms"]
+    assert metricas.REGISTRO.valor('ramais_plan_regression', consulta='intercement') == 1
+
+    # Uma nova instância (restart) compara com a base gravada
+    assert planos.CapturaPlanos(caminho_base=str(caminho)).base['intercement']['execucao_ms'] == 100.0
+
+
+def test_so_amostra_com_pool_thread_safe(tmp_path):
+    captura = planos.CapturaPlanos(intervalo=0, caminho_base=str(tmp_path / 'base.json'))
+    simples = pool.SimpleConnectionPool.__new__(pool.SimpleConnectionPool)
+
+    assert captura.amostrar(simples, 'intercement', "SELECT 1") is False
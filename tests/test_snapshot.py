@@ -0,0 +1,18 @@
+import logging
+
+import snapshot
+
+
+def test_falha_do_carregador_fica_no_log(caplog):
+    store = snapshot.SnapshotStore()
+
+    def carregador():
+        raise RuntimeError("banco fora do ar")
+
+    store.registrar_carregador(carregador, ttl=300)
+
+    with caplog.at_level(logging.WARNING, logger='snapshot'):
+        assert store.obter() is None
+
+    assert "Falha ao recarregar o snapshot" in caplog.text
+    assert "banco fora do ar" in caplog.text
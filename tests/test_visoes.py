@@ -0,0 +1,84 @@
+import pandas as pd
+
+import snapshot
+import visoes
+
+
+def _snap(store, linhas=40):
+    return store.publicar(pd.DataFrame({
+        'serviceid': [str(1000 + i) for i in range(linhas)],
+        'boname': ['Unidade A' if i % 2 else 'Unidade B' for i in range(linhas)],
+        'bglinename': [f'Usuário {i}' for i in range(linhas)],
+        'status': [snapshot.STATUS_REGISTRADO] * linhas,
+    }))
+
+
+def _tamanho(snap, unidade):
+    return visoes.calcular_visao(snap.df, unidade, 'Todos', '').tamanho
+
+
+def test_acerto_devolve_a_mesma_visao():
+    snap = _snap(snapshot.SnapshotStore())
+    cache = visoes.CacheVisoes(10 * 1024 * 1024)
+
+    primeira = cache.obter(snap, 'Todas', 'Todos', 'Usuário 1')
+    assert cache.obter(snap, 'Todas', 'Todos', 'usuário 1') is primeira
+    assert (cache.acertos, cache.faltas) == (1, 1)
+
+
+def test_busca_filtra_como_digitada():
+    snap = _snap(snapshot.SnapshotStore())
+    cache = visoes.CacheVisoes(10 * 1024 * 1024)
+
+    # "Usuário 1" acha 1 e 10-19; com espaço no fim não acha nenhum (como na API)
+    assert cache.obter(snap, 'Todas', 'Todos', 'usuário 1').linhas == 11
+    assert cache.obter(snap, 'Todas', 'Todos', 'usuário 1 ').linhas == 0
+    assert cache.obter(snap, 'Todas', 'Todos', 'usuário 1 ').linhas == len(
+        snapshot.filtrar_ramais(snap.df, 'Todas', 'Todos', 'usuário 1 '))
+
+
+def test_despeja_a_menos_usada_dentro_do_orcamento():
+    snap = _snap(snapshot.SnapshotStore())
+    orcamento = _tamanho(snap, 'Unidade A') + _tamanho(snap, 'Unidade B') + 10
+    cache = visoes.CacheVisoes(orcamento)
+
+    cache.obter(snap, 'Unidade A', 'Todos', '')
+    cache.obter(snap, 'Unidade B', 'Todos', '')
+    a = cache.obter(snap, 'Unidade A', 'Todos', '')   # A passa a ser a mais recente
+    cache.obter(snap, 'Todas', 'Todos', 'usuário 1')  # estoura o orçamento: sai B
+
+    assert cache.estatisticas()['bytes'] <= orcamento
+    assert cache.obter(snap, 'Unidade A', 'Todos', '') is a
+    faltas = cache.faltas
+    cache.obter(snap, 'Unidade B', 'Todos', '')
+    assert cache.faltas == faltas + 1
+
+
+def test_snapshot_novo_descarta_versoes_anteriores():
+    store = snapshot.SnapshotStore()
+    cache = visoes.CacheVisoes(10 * 1024 * 1024)
+    antigo = _snap(store)
+    cache.obter(antigo, 'Todas', 'Todos', '')
+    cache.csv(antigo, 'Todas', 'Todos', '')
+
+    cache.novo_snapshot(_snap(store))
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['entradas'], estatisticas['bytes']) == (0, 0)
+    assert (estatisticas['entradas_csv'], estatisticas['bytes_csv']) == (0, 0)
+
+    # Sessão atrasada ainda com o snapshot antigo: calcula, mas não guarda
+    cache.obter(antigo, 'Todas', 'Todos', '')
+    assert cache.estatisticas()['entradas'] == 0
+
+
+def test_csv_so_e_gerado_quando_pedido():
+    snap = _snap(snapshot.SnapshotStore())
+    cache = visoes.CacheVisoes(10 * 1024 * 1024)
+
+    for prefixo in ('u', 'us', 'usu'):
+        cache.obter(snap, 'Todas', 'Todos', prefixo)
+    assert cache.estatisticas()['entradas_csv'] == 0
+
+    csv = cache.csv(snap, 'Todas', 'Todos', 'usu')
+    assert csv.startswith('serviceid,boname,bglinename,status\n')
+    assert cache.csv(snap, 'Todas', 'Todos', 'usu') is csv
@@ -0,0 +1,177 @@
+"""
+Cache LRU de visões filtradas, compartilhado entre as sessões do processo.
+
+A maioria das sessões pede as mesmas poucas combinações de filtro ("Todas" /
+"Todos", as unidades grandes, "Não Registrado"). Cada visão é calculada uma
+vez por snapshot: a tabela já projetada/renomeada e o total de linhas. A
+chave é (versão do snapshot, unidade, status, busca em maiúsculas); quando um
+snapshot novo é publicado, as entradas antigas saem. O tamanho total
+respeita um orçamento de memória (VISOES_CACHE_MB).
+
+O CSV do download não faz parte da visão: a busca gera uma visão por tecla
+("s", "si", "sil"...) e quase nenhuma é baixada. Ele é gerado só quando a
+sessão pede o download e fica em um LRU próprio (VISOES_CSV_MB).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+import metricas
+import snapshot
+
+ORCAMENTO_PADRAO_MB = 256
+ORCAMENTO_CSV_PADRAO_MB = 64
+
+
+@dataclass(frozen=True)
+class Visao:
+    exibicao: pd.DataFrame
+    linhas: int
+    tamanho: int
+
+
+def normalizar_busca(busca):
+    # Só para a chave: o filtro recebe a busca como digitada (igual à
+    # /api/ramais). contains(case=False) compara em maiúsculas, então buscas
+    # com o mesmo upper() dão sempre o mesmo resultado
+    return (busca or '').upper()
+
+
+def chave(snap, unidade, status, busca):
+    return (snap.versao, unidade, status, normalizar_busca(busca))
+
+
+def calcular_visao(df, unidade, status, busca):
+    filtrado = snapshot.filtrar_ramais(df, unidade, status, busca)
+    exibicao = snapshot.projetar_exibicao(filtrado)
+    tamanho = int(exibicao.memory_usage(index=True, deep=True).sum())
+    return Visao(exibicao=exibicao, linhas=len(filtrado), tamanho=tamanho)
+
+
+def calcular_csv(df, unidade, status, busca):
+    filtrado = snapshot.filtrar_ramais(df, unidade, status, busca)
+    return filtrado.to_csv(index=False, encoding='utf-8-sig')
+
+
+class _LRU:
+    """OrderedDict com orçamento em bytes; chamado sempre sob o lock do cache."""
+
+    def __init__(self, orcamento_bytes, tamanho):
+        self.orcamento = orcamento_bytes
+        self._tamanho = tamanho
+        self._entradas = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave):
+        valor = self._entradas.get(chave)
+        if valor is not None:
+            self._entradas.move_to_end(chave)
+        return valor
+
+    def guardar(self, chave, valor):
+        if self._tamanho(valor) > self.orcamento or chave in self._entradas:
+            return
+        self._entradas[chave] = valor
+        self.bytes += self._tamanho(valor)
+        while self.bytes > self.orcamento and self._entradas:
+            _, antigo = self._entradas.popitem(last=False)
+            self.bytes -= self._tamanho(antigo)
+
+    def descartar_anteriores(self, versao):
+        for chave in [c for c in self._entradas if c[0] < versao]:
+            self.bytes -= self._tamanho(self._entradas.pop(chave))
+
+
+class CacheVisoes:
+    def __init__(self, orcamento_bytes, orcamento_csv_bytes=None):
+        if orcamento_csv_bytes is None:
+            orcamento_csv_bytes = ORCAMENTO_CSV_PADRAO_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._visoes = _LRU(orcamento_bytes, lambda visao: visao.tamanho)
+        self._csvs = _LRU(orcamento_csv_bytes, len)
+        self._versao = 0
+        self.acertos = 0
+        self.faltas = 0
+
+    def _obter(self, lru, snap, unidade, status, busca, calcular, contar=False):
+        chave_visao = chave(snap, unidade, status, busca)
+
+        with self._lock:
+            valor = lru.obter(chave_visao)
+            if contar:
+                if valor is None:
+                    self.faltas += 1
+                else:
+                    self.acertos += 1
+            if valor is not None:
+                return valor
+
+        # Calculado fora do lock: duas sessões podem calcular a mesma visão ao
+        # mesmo tempo, mas nenhuma sessão espera pelo filtro de outra
+        valor = calcular(snap.df, unidade, status, busca)
+
+        with self._lock:
+            if snap.versao >= self._versao:
+                lru.guardar(chave_visao, valor)
+        return valor
+
+    def obter(self, snap, unidade, status, busca):
+        return self._obter(self._visoes, snap, unidade, status, busca, calcular_visao, contar=True)
+
+    def csv(self, snap, unidade, status, busca):
+        """CSV da visão, gerado só no primeiro pedido de download."""
+        return self._obter(self._csvs, snap, unidade, status, busca, calcular_csv)
+
+    def novo_snapshot(self, snap):
+        """Assinante do SnapshotStore: descarta visões de versões anteriores."""
+        with self._lock:
+            self._versao = max(self._versao, snap.versao)
+            self._visoes.descartar_anteriores(self._versao)
+            self._csvs.descartar_anteriores(self._versao)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'entradas': len(self._visoes),
+                'bytes': self._visoes.bytes,
+                'entradas_csv': len(self._csvs),
+                'bytes_csv': self._csvs.bytes,
+            }
+
+
+CACHE = None
+
+
+def _coletor():
+    if CACHE is None:
+        return []
+    estatisticas = CACHE.estatisticas()
+    return [
+        ('ramais_view_cache_hits_total', {}, estatisticas['acertos']),
+        ('ramais_view_cache_misses_total', {}, estatisticas['faltas']),
+        ('ramais_view_cache_entries', {}, estatisticas['entradas']),
+        ('ramais_view_cache_bytes', {}, estatisticas['bytes']),
+        ('ramais_view_cache_csv_entries', {}, estatisticas['entradas_csv']),
+        ('ramais_view_cache_csv_bytes', {}, estatisticas['bytes_csv']),
+    ]
+
+
+def iniciar():
+    """Cria o cache do processo e o liga à publicação de snapshots."""
+    global CACHE
+    if CACHE is None:
+        orcamento = float(os.getenv('VISOES_CACHE_MB', ORCAMENTO_PADRAO_MB)) * 1024 * 1024
+        orcamento_csv = float(os.getenv('VISOES_CSV_MB', ORCAMENTO_CSV_PADRAO_MB)) * 1024 * 1024
+        CACHE = CacheVisoes(int(orcamento), int(orcamento_csv))
+        snapshot.STORE.assinar(CACHE.novo_snapshot)
+        metricas.REGISTRO.registrar_coletor(_coletor)
+    return CACHE